@@ -1,13 +1,36 @@
 from flask import Flask
 from flask_cors import CORS
+import logging
 import os
+import sys
 
 count_statement = 0
 
-def custom_print(*args, **kwargs):
-    global count_statement
-    print(f"{count_statement} --", *args, **kwargs)
-    count_statement += 1
+class StatementCounter(logging.Filter):
+    """Prefix every emitted message with a running statement count"""
+    def filter(self, record):
+        global count_statement
+        record.count = count_statement
+        count_statement += 1
+        return True
+
+# Backend log; LOG_LEVEL=DEBUG shows per-node execution details
+logger = logging.getLogger('app')
+logger.setLevel(os.environ.get('LOG_LEVEL', 'INFO').upper())
+logger.propagate = False
+_handler = logging.StreamHandler(sys.stdout)
+_handler.setFormatter(logging.Formatter('%(count)s -- %(message)s'))
+_handler.addFilter(StatementCounter())
+logger.addHandler(_handler)
+
+def custom_print(*args, level=logging.INFO, **kwargs):
+    """print()-style logging at the given level; arguments are only joined when it is enabled.
+    
+    For messages that are expensive to build, call logger.debug('... %s', value)
+    (formatted lazily) or guard the call with logger.isEnabledFor(logging.DEBUG).
+    """
+    if logger.isEnabledFor(level):
+        logger.log(level, kwargs.get('sep', ' ').join(str(arg) for arg in args))
 
 def create_app():
     app = Flask(__name__)
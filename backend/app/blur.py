@@ -0,0 +1,57 @@
+import cv2
+import numpy as np
+
+# From this sigma on, a cascade of box filters is faster than a sampled Gaussian kernel
+BOX_CASCADE_SIGMA = 8.0
+BOX_PASSES = 3
+# Depths the OpenCV filters work on directly; anything else is converted to float32
+BLUR_DEPTHS = (np.uint8, np.uint16, np.int16, np.float32)
+
+
+def box_widths(sigma, passes=BOX_PASSES):
+    """Odd widths of passes box filters whose cascade has (almost) the variance sigma**2.
+
+    The widths are the two odd integers around the ideal width, as many of the
+    smaller one as brings the summed variance (w**2 - 1) / 12 closest to sigma**2.
+    """
+    ideal = np.sqrt(12 * sigma * sigma / passes + 1)
+    lower = int(ideal)
+    if lower % 2 == 0:
+        lower -= 1
+    smaller = round((12 * sigma * sigma - passes * lower * lower - 4 * passes * lower - 3 * passes) / (-4 * lower - 4))
+    return [lower if i < smaller else lower + 2 for i in range(passes)]
+
+
+def gaussian_blur(image, sigma, ksize=None, border=cv2.BORDER_REFLECT_101):
+    """Gaussian blur of all channels of an image in one call, keeping its dtype.
+
+    ksize is the kernel window (odd); by default the kernel is truncated at 4
+    sigma like scipy.ndimage.gaussian_filter. Small sigmas, or windows too
+    narrow for the Gaussian's tails, use cv2.GaussianBlur, whose cost grows with
+    the window. From BOX_CASCADE_SIGMA on, the blur is approximated by
+    BOX_PASSES box filters in float32, each constant-time per pixel whatever
+    its width, to within about 2 gray levels. Nothing is computed in float64:
+    float64 and other depths OpenCV does not filter are blurred in float32 and
+    converted back.
+    """
+    if image.dtype not in BLUR_DEPTHS:
+        return _gaussian_blur(image.astype(np.float32), sigma, ksize, border).astype(image.dtype)
+    return _gaussian_blur(image, sigma, ksize, border)
+
+
+def _gaussian_blur(image, sigma, ksize, border):
+    if ksize is None:
+        if sigma <= 0:
+            return image.copy()
+        ksize = 2 * int(4.0 * sigma + 0.5) + 1
+    if sigma < BOX_CASCADE_SIGMA or ksize < 6 * sigma:
+        return cv2.GaussianBlur(image, (ksize, ksize), sigma, borderType=border)
+    blurred = image.astype(np.float32)
+    for width in box_widths(sigma):
+        blurred = cv2.blur(blurred, (width, width), borderType=border)
+    if image.dtype == np.float32:
+        return blurred
+    # Round and saturate back to the input depth
+    limits = np.iinfo(image.dtype)
+    np.rint(blurred, out=blurred)
+    return np.clip(blurred, limits.min, limits.max, out=blurred).astype(image.dtype)
@@ -0,0 +1,111 @@
+import threading
+import cv2
+import numpy as np
+from scipy.ndimage import sobel
+from .spectral import Spectrum
+
+# Fixed-point luminance weights (0.299, 0.587, 0.114) scaled by 2**14; they sum to 2**14
+LUMA_SHIFT = 14
+LUMA_WEIGHTS = (4899, 9617, 1868)
+# Largest run of pixels cv2.calcHist counts exactly in its float32 bins
+HISTOGRAM_CHUNK = 1 << 24
+
+
+def luminance(image):
+    """Grayscale of an RGB(A) uint8 image: floor((4899 R + 9617 G + 1868 B) / 2**14).
+
+    cv2.transform evaluates the integer weights in floating point, where every
+    intermediate is exact; the offset of -0.5 + 2**-15 turns its rounding into
+    the floor of the fixed-point sum. Other dtypes use the same weights in
+    floating point.
+    """
+    if image.dtype != np.uint8 or image.shape[2] not in (3, 4):
+        return np.dot(image[..., :3], [0.299, 0.587, 0.114]).astype(np.uint8)
+    weights = [weight / (1 << LUMA_SHIFT) for weight in LUMA_WEIGHTS]
+    matrix = np.array([weights + [0.0] * (image.shape[2] - 3) + [-0.5 + 2.0 ** -(LUMA_SHIFT + 1)]])
+    return cv2.transform(image, matrix)
+
+
+def histogram(image):
+    """Exact counts of each of the 256 values in a uint8 array (all channels together)"""
+    flat = np.ascontiguousarray(image).reshape(-1)
+    counts = np.zeros(256, dtype=np.int64)
+    for start in range(0, flat.size, HISTOGRAM_CHUNK):
+        chunk = flat[start:start + HISTOGRAM_CHUNK].reshape(1, -1)
+        counts += cv2.calcHist([chunk], [0], None, [256], [0, 256]).reshape(-1).astype(np.int64)
+    return counts
+
+
+def sobel_gradients(gray):
+    """Sobel derivatives of a grayscale image along rows (axis 0) and columns (axis 1)"""
+    return sobel(gray, axis=0, mode='reflect'), sobel(gray, axis=1, mode='reflect')
+
+
+def spectrum(gray):
+    """Real-FFT spectrum of a grayscale image (see app.spectral.Spectrum)"""
+    return Spectrum.of(gray)
+
+
+class _Product:
+    def __init__(self, source):
+        # Holding the source keeps its id from being reused while the product is cached
+        self.source = source
+        self.value = None
+        self.error = None
+        self.ready = threading.Event()
+
+
+class DerivedProducts:
+    """Products derived from image buffers, computed once per graph execution.
+
+    Several nodes often need the same intermediate of the same input: the
+    luminance plane, its histogram, Sobel gradients or its spectrum. Products are
+    keyed by kind and the identity of the source buffer, so every consumer of a
+    node output shares one computation; concurrent requests from parallel
+    branches wait for the first. The engine creates a registry per execution and
+    drops it afterwards.
+    """
+
+    def __init__(self):
+        self._products = {}
+        self._lock = threading.Lock()
+        self.computed = 0
+        self.shared = 0
+
+    def get(self, kind, source, compute):
+        key = (kind, id(source))
+        with self._lock:
+            product = self._products.get(key)
+            owner = product is None
+            if owner:
+                product = self._products[key] = _Product(source)
+                self.computed += 1
+            else:
+                self.shared += 1
+        if owner:
+            try:
+                product.value = compute(source)
+            except Exception as e:
+                product.error = e
+                raise
+            finally:
+                product.ready.set()
+        else:
+            product.ready.wait()
+            if product.error is not None:
+                raise product.error
+        return product.value
+
+    def stats(self):
+        return {'computed': self.computed, 'shared': self.shared}
+
+    def clear(self):
+        with self._lock:
+            self._products.clear()
+
+
+def derive(products, kind, source, compute):
+    """compute(source), shared through products when a registry is active"""
+    if products is None:
+        return compute(source)
+    return products.get(kind, source, compute)
@@ -1,8 +1,23 @@
 import numpy as np
 from collections import defaultdict, deque
+from contextlib import contextmanager
+import atexit
 import json
+import logging
 import os
-from app import custom_print
+import threading
+import time
+from app import custom_print, logger
+from .result_cache import (ResultCache, default_cache_max_bytes, is_volatile, make_key, output_hash, result_nbytes,
+                           volatile_key)
+from .scheduler import GraphScheduler
+from .tiling import run_tiled
+from .lut import run_point_chain
+from .derived import DerivedProducts
+from .proxy import ProxyPolicy
+from .persistence import StateWriter
+from .tracing import trace_span
+from .nodes.base import FrequencyNode, NeighborhoodNode, PointNode
 
 NODE_TYPE_MAP = {
     'imageInputNode': 'ImageInput',
@@ -80,13 +95,54 @@ NODE_TYPE_MAP = {
 }
 
 class GraphEngine:
-    def __init__(self):
+    def __init__(self, cache_max_bytes=None, max_workers=None, state_file=None, persist=True,
+                 tile_rows=None, proxy_max_side=None, latency_budget_ms=None, save_delay_ms=None,
+                 result_cache=None, scheduler=None, decoded_cache_max_bytes=None):
         self.nodes = {}
         self.connections = []
         self.node_instances = {}
         
+        # Forward/reverse adjacency over self.connections and the cached execution order
+        self._outgoing = defaultdict(list)
+        self._incoming = defaultdict(lambda: defaultdict(list))
+        self._connection_keys = set()
+        self._topological_order = None
+        
+        # Results retained between executions and the nodes that must re-run
+        self.node_results = {}
+        self.dirty_nodes = set()
+        
+        # Content-addressed cache of node results, shared across graph reloads; a cache
+        # passed in (e.g. by SessionRegistry) is shared with other engines and outlives this one
+        self._owns_cache = result_cache is None
+        if result_cache is None:
+            result_cache = ResultCache(default_cache_max_bytes() if cache_max_bytes is None else cache_max_bytes)
+        self.result_cache = result_cache
+        self.result_hashes = {}
+        self._tracer = None
+        self._products = None
+        # Per-node wall/CPU time, output size and cache outcome of the last execution
+        self.last_timings = {}
+        
+        # Thread pool for independent branches, possibly shared; one execution at a time per engine
+        self._owns_scheduler = scheduler is None
+        self.scheduler = scheduler or GraphScheduler(max_workers)
+        self._execution_lock = threading.RLock()
+        
+        # Strip height for tiled execution of neighborhood-node chains (None disables tiling)
+        if tile_rows is None and os.environ.get('GRAPH_TILE_ROWS'):
+            tile_rows = int(os.environ['GRAPH_TILE_ROWS'])
+        self.tile_rows = tile_rows
+        
+        # Resolution policy for interactive (proxy) executions and the scale of the retained results
+        self.proxy_policy = ProxyPolicy(proxy_max_side, latency_budget_ms)
+        self.execution_scale = 1.0
+        
         # Import node classes
-        from .nodes.image_input import ImageInputNode
+        from .nodes.image_input import ImageInputNode, decoded_cache
+        # The decoded-image cache is per process; None keeps its size (DECODED_CACHE_MAX_MB), 0 disables it
+        if decoded_cache_max_bytes is not None:
+            decoded_cache.set_max_bytes(decoded_cache_max_bytes)
         from .nodes.brightness_contrast import BrightnessContrastNode
         from .nodes.gaussian_blur import GaussianBlurNode
         from .nodes.threshold import ThresholdNode
@@ -161,8 +217,16 @@ class GraphEngine:
             'GLCM': GLCMNode,
         }
         
-        self.state_file = os.path.join(os.path.dirname(__file__), 'graph_state.json')
-        self.load_graph_state_from_disk()
+        # persist=False keeps the engine in memory only (e.g. batch workers)
+        self.persist = persist
+        self.state_file = state_file or os.path.join(os.path.dirname(__file__), 'graph_state.json')
+        # Saves are coalesced and written in the background; bulk updates save once at the end
+        self.state_writer = StateWriter(self.state_file, self.get_graph_state, save_delay_ms)
+        self._bulk_depth = 0
+        self._bulk_save_pending = False
+        if self.persist:
+            self.load_graph_state_from_disk()
+            atexit.register(self.flush_graph_state)
     
     def add_node(self, node_id, node_type, params=None):
         """Add a node to the graph"""
@@ -174,16 +238,25 @@ class GraphEngine:
         self.nodes[node_id] = {
             'id': node_id,
             'type': backend_node_type,
-            'params': params or {},
+            # Share the instance's params dict so parameter updates are persisted
+            'params': node_instance.params,
             'position': None,
             'metadata': {}
         }
         self.node_instances[node_id] = node_instance
+        self._topological_order = None
+        self.mark_dirty(node_id)
         self.save_graph_state_to_disk()
         return node_instance
     
     def remove_node(self, node_id):
         """Remove a node from the graph"""
+        # Everything fed by this node loses an input
+        self.mark_dirty(node_id)
+        self.dirty_nodes.discard(node_id)
+        self.node_results.pop(node_id, None)
+        self.result_hashes.pop(node_id, None)
+        
         if node_id in self.nodes:
             del self.nodes[node_id]
         
@@ -193,6 +266,7 @@ class GraphEngine:
         # Remove connections involving this node
         self.connections = [conn for conn in self.connections 
                           if conn['from_node'] != node_id and conn['to_node'] != node_id]
+        self._rebuild_connection_index()
         self.save_graph_state_to_disk()
     
     def add_connection(self, from_node, from_socket, to_node, to_socket):
@@ -206,71 +280,56 @@ class GraphEngine:
             'to_node': to_node,
             'to_socket': to_socket
         }
-        if connection not in self.connections:
+        if self._connection_key(connection) not in self._connection_keys:
             self.connections.append(connection)
+            self._index_connection(connection)
+            self.mark_dirty(to_node)
         self.save_graph_state_to_disk()
     
     def remove_connection(self, from_node, from_socket, to_node, to_socket):
         """Remove a connection between nodes"""
-        self.connections = [conn for conn in self.connections 
-                          if not (conn['from_node'] == from_node and 
-                                 conn['from_socket'] == from_socket and
-                                 conn['to_node'] == to_node and 
-                                 conn['to_socket'] == to_socket)]
+        key = (from_node, from_socket, to_node, to_socket)
+        if key in self._connection_keys:
+            self.mark_dirty(to_node)
+            self.connections = [conn for conn in self.connections 
+                                if self._connection_key(conn) != key]
+            self._rebuild_connection_index()
         self.save_graph_state_to_disk()
     
+    @staticmethod
+    def _connection_key(conn):
+        return (conn['from_node'], conn['from_socket'], conn['to_node'], conn['to_socket'])
+    
+    def _index_connection(self, conn):
+        """Add a connection to the adjacency maps"""
+        self._outgoing[conn['from_node']].append(conn)
+        self._incoming[conn['to_node']][conn['to_socket']].append(conn)
+        self._connection_keys.add(self._connection_key(conn))
+        self._topological_order = None
+    
+    def _rebuild_connection_index(self):
+        """Rebuild the adjacency maps after self.connections was replaced"""
+        self._outgoing = defaultdict(list)
+        self._incoming = defaultdict(lambda: defaultdict(list))
+        self._connection_keys = set()
+        for conn in self.connections:
+            self._index_connection(conn)
+        self._topological_order = None
+    
     def would_create_cycle(self, from_node, to_node):
         """Check if adding a connection would create a cycle"""
-        # Simple cycle detection using DFS
-        visited = set()
-        rec_stack = set()
-        
-        def has_cycle_dfs(node):
-            visited.add(node)
-            rec_stack.add(node)
-            
-            # Check all outgoing connections
-            for conn in self.connections:
-                if conn['from_node'] == node:
-                    neighbor = conn['to_node']
-                    if neighbor not in visited:
-                        if has_cycle_dfs(neighbor):
-                            return True
-                    elif neighbor in rec_stack:
-                        return True
-            
-            rec_stack.remove(node)
-            return False
-        
-        # Temporarily add the connection
-        temp_conn = {
-            'from_node': from_node,
-            'to_node': to_node
-        }
-        self.connections.append(temp_conn)
-        
-        # Check for cycles
-        has_cycle = False
-        for node in self.nodes:
-            if node not in visited:
-                if has_cycle_dfs(node):
-                    has_cycle = True
-                    break
-        
-        # Remove temporary connection
-        self.connections.remove(temp_conn)
-        
-        return has_cycle
+        # The new edge closes a cycle only if from_node is already reachable from to_node
+        return from_node in self.get_downstream_nodes(to_node)
     
     def get_topological_order(self):
-        """Get nodes in topological order"""
+        """Get nodes in topological order, cached until the topology changes"""
+        if self._topological_order is not None:
+            return list(self._topological_order)
+        
         # Calculate in-degrees
         in_degree = defaultdict(int)
         for node in self.nodes:
-            in_degree[node] = 0
-        
-        for conn in self.connections:
-            in_degree[conn['to_node']] += 1
+            in_degree[node] = sum(len(conns) for conns in self._incoming.get(node, {}).values())
         
         # Kahn's algorithm
         queue = deque([node for node in self.nodes if in_degree[node] == 0])
@@ -281,191 +340,578 @@ class GraphEngine:
             result.append(node)
             
             # Reduce in-degree for neighbors
-            for conn in self.connections:
-                if conn['from_node'] == node:
-                    neighbor = conn['to_node']
-                    in_degree[neighbor] -= 1
-                    if in_degree[neighbor] == 0:
-                        queue.append(neighbor)
+            for conn in self._outgoing.get(node, ()):
+                neighbor = conn['to_node']
+                in_degree[neighbor] -= 1
+                if in_degree[neighbor] == 0:
+                    queue.append(neighbor)
         
-        return result
+        self._topological_order = result
+        return list(result)
+    
+    def get_downstream_nodes(self, node_id):
+        """Get every node reachable from node_id, including node_id itself"""
+        reached = {node_id}
+        stack = [node_id]
+        while stack:
+            node = stack.pop()
+            for conn in self._outgoing.get(node, ()):
+                if conn['to_node'] not in reached:
+                    reached.add(conn['to_node'])
+                    stack.append(conn['to_node'])
+        return reached
+    
+    def get_upstream_nodes(self, node_ids):
+        """Get every node that feeds any of node_ids, including node_ids themselves"""
+        reached = set(node_ids)
+        stack = list(reached)
+        while stack:
+            node = stack.pop()
+            for conns in self._incoming.get(node, {}).values():
+                for conn in conns:
+                    if conn['from_node'] not in reached:
+                        reached.add(conn['from_node'])
+                        stack.append(conn['from_node'])
+        return reached
+    
+    def mark_dirty(self, node_id):
+        """Flag a node and everything downstream of it for re-execution"""
+        self.dirty_nodes.update(self.get_downstream_nodes(node_id))
+    
+    def set_image(self, node_id, image_file, max_side=None):
+        """Load an uploaded image into an input node (max_side: see ImageInputNode.set_image)"""
+        node_instance = self.node_instances[node_id]
+        success = node_instance.set_image(image_file, max_side)
+        if success:
+            self.mark_dirty(node_id)
+        return success
     
     def get_node_inputs(self, node_id):
         """Get all inputs for a specific node"""
         inputs = {}
-        for conn in self.connections:
-            if conn['to_node'] == node_id:
-                inputs[conn['to_socket']] = {
+        for to_socket, conns in self._incoming.get(node_id, {}).items():
+            if conns:
+                # Like the connection list, the most recent edge into a socket wins
+                conn = conns[-1]
+                inputs[to_socket] = {
                     'from_node': conn['from_node'],
                     'from_socket': conn['from_socket']
                 }
         return inputs
     
-    def execute_graph(self):
-        """Execute the entire graph in topological order"""
+    def get_output(self, node_id, socket, proxy=True):
+        """Current value and content hash of one output socket, re-executing the node if it is stale.
+
+        Returns (None, None) if the node does not exist or did not produce the socket.
+        """
+        with self._execution_lock:
+            if node_id not in self.node_instances:
+                return None, None
+            # A full-resolution request can't be answered from a proxy result
+            stale = node_id in self.dirty_nodes or node_id not in self.node_results
+            if stale or (not proxy and self.execution_scale != 1.0):
+                self.execute_graph(targets=[node_id], proxy=proxy)
+            value = self.node_results.get(node_id, {}).get(socket)
+            if value is None:
+                return None, None
+            return value, self.result_hashes.get(node_id, {}).get(socket)
+    
+    def execute_graph(self, targets=None, proxy=False, latency_budget_ms=None, tracer=None):
+        """Execute the graph, re-running only dirty nodes and running independent branches in parallel.
+        
+        If targets is given, only those nodes and the nodes upstream of them are evaluated.
+        With proxy=True the inputs are downscaled for interactive previews (see app.proxy).
+        With a tracer (see app.tracing) the run is recorded as trace-event spans.
+        """
+        with self._execution_lock:
+            self._tracer = tracer
+            # Luminance, histograms, gradients and spectra are shared by the nodes of one execution
+            self._products = DerivedProducts()
+            self._set_products(self._products)
+            try:
+                with trace_span(tracer, 'execute_graph', targets=targets, proxy=proxy):
+                    return self._execute_graph(targets, proxy, latency_budget_ms)
+            finally:
+                self._tracer = None
+                self._set_products(None)
+                self._products.clear()
+    
+    def _set_products(self, products):
+        for node_instance in self.node_instances.values():
+            node_instance.products = products
+    
+    def _execute_graph(self, targets, proxy, latency_budget_ms):
         try:
-            custom_print(f"Executing graph with {len(self.nodes)} nodes and {len(self.connections)} connections")
-            
-            # Get execution order
-            execution_order = self.get_topological_order()
-            custom_print(f"Execution order: {execution_order}\n")
-            
-            # Store results for each node
-            node_results = {}
+            logger.debug("Executing graph with %d nodes and %d connections", len(self.nodes), len(self.connections))
+            started = time.perf_counter()
+            scale = self._set_execution_scale(proxy, latency_budget_ms)
             
-            # Execute nodes in order
+            # Get execution order, restricted to the subgraph feeding the targets
+            with trace_span(self._tracer, 'topological_sort'):
+                execution_order = self.get_topological_order()
+                if targets is not None:
+                    required = self.get_upstream_nodes(targets)
+                    execution_order = [node_id for node_id in execution_order if node_id in required]
+            logger.debug("Execution order: %s", execution_order)
             for node_id in execution_order:
                 if node_id not in self.node_instances:
-                    custom_print(f"Warning: Node {node_id} not found in instances")
-                    continue
-                
-                node_instance = self.node_instances[node_id]
-                custom_print(f"Processing node {node_id} of type {node_instance.__class__.__name__}")
-                
-                # Gather inputs
-                inputs = {}
-                node_inputs = self.get_node_inputs(node_id)
-                custom_print(f"Node {node_id} inputs: {node_inputs}")
-                
-                for socket_name, connection in node_inputs.items():
-                    from_node = connection['from_node']
-                    if from_node in node_results:
-                        from_socket = connection['from_socket']
-                        if from_socket in node_results[from_node]:
-                            inputs[socket_name] = node_results[from_node][from_socket]
-                            custom_print(f"  Input {socket_name}: {type(node_results[from_node][from_socket])}")
-                        else:
-                            custom_print(f"  Warning: Socket {from_socket} not found in {from_node} results")
+                    custom_print(f"Warning: Node {node_id} not found in instances", level=logging.WARNING)
+            
+            # Without explicit targets every node's result is wanted
+            wanted = set(execution_order) if targets is None else set(targets)
+            with trace_span(self._tracer, 'plan_execution'):
+                to_run = self._plan_execution(execution_order, wanted)
+            
+            # Clean nodes keep the result from the previous execution
+            run_set = set(to_run)
+            node_results = {node_id: self.node_results[node_id] for node_id in execution_order
+                            if node_id not in run_set and node_id in self.node_results}
+            timings = {'nodes': {node_id: {'cache': 'retained', 'output_bytes': result_nbytes(result)}
+                                 for node_id, result in node_results.items()}}
+            
+            # A stage waits for the stages that produce its inputs
+            with trace_span(self._tracer, 'build_stages'):
+                stages = self._build_stages(to_run, wanted)
+            stage_of = {node_id: tail for tail, stage in stages.items() for node_id in stage}
+            dependencies = {
+                tail: {stage_of[conn['from_node']]
+                       for node_id in stage
+                       for conn in self.get_node_inputs(node_id).values()
+                       if conn['from_node'] in stage_of and stage_of[conn['from_node']] != tail}
+                for tail, stage in stages.items()
+            }
+            
+            def on_done(tail, outcomes):
+                for node_id, result, cache_key, stats in outcomes:
+                    timings['nodes'][node_id] = stats
+                    if result is not None:
+                        node_results[node_id] = result
+                        self.node_results[node_id] = result
+                        self.result_hashes[node_id] = self._output_hashes(node_id, result, cache_key, node_results)
                     else:
-                        custom_print(f"  Warning: Node {from_node} not found in results")
-                
-                # Process node
-                result = node_instance.process(inputs)
-                node_results[node_id] = result
-                custom_print(f"  Result keys: {list(result.keys()) if result else 'None'}")
-                
-                # Check if image was produced
-                if result and 'image' in result and result['image'] is not None:
-                    custom_print(f"  Image shape: {result['image'].shape}")
-                else:
-                    custom_print(f"  No image in result")
+                        # Fused intermediate: never materialized, but its content hash is known
+                        self.node_results.pop(node_id, None)
+                        self.result_hashes[node_id] = {'image': output_hash(cache_key, 'image')}
+                    self.dirty_nodes.discard(node_id)
             
-            custom_print(f"Final results: {list(node_results.keys())}")
-            return node_results
+            self.scheduler.run(list(stages), dependencies,
+                               lambda tail: self._execute_stage(stages[tail], node_results), on_done)
+            if proxy and to_run:
+                self.proxy_policy.record(time.perf_counter() - started,
+                                         self._input_megapixels() * scale * scale, len(to_run))
+            
+            # Present results in execution order regardless of completion order
+            ordered_results = {node_id: node_results[node_id]
+                               for node_id in execution_order if node_id in node_results}
+            timings['execute_ms'] = (time.perf_counter() - started) * 1000
+            timings['scale'] = scale
+            timings['nodes_run'] = len(to_run)
+            timings['derived'] = self._products.stats()
+            self.last_timings = timings
+            logger.debug("Executed %d of %d nodes in %.1f ms", len(to_run), len(execution_order), timings['execute_ms'])
+            logger.debug("Final results: %s", list(ordered_results))
+            return ordered_results
             
         except Exception as e:
-            custom_print(f"Error executing graph: {e}")
+            custom_print(f"Error executing graph: {e}", level=logging.ERROR)
             import traceback
             traceback.print_exc()
             return {}
     
+    def _input_dimensions(self):
+        """(longest, shortest) side of the largest loaded input image"""
+        largest = (0, 0)
+        for node_instance in self.node_instances.values():
+            shape = getattr(node_instance, 'image_shape', None)
+            if shape is not None:
+                sides = sorted(shape[:2], reverse=True)
+                if sides[0] * sides[1] > largest[0] * largest[1]:
+                    largest = (sides[0], sides[1])
+        return largest
+    
+    def _input_megapixels(self):
+        longest, shortest = self._input_dimensions()
+        return longest * shortest / 1e6
+    
+    def _set_execution_scale(self, proxy, latency_budget_ms):
+        """Pick the resolution for this execution and hand it to every node"""
+        scale = 1.0
+        if proxy:
+            longest, shortest = self._input_dimensions()
+            scale = self.proxy_policy.choose_scale(longest, shortest, len(self.nodes), latency_budget_ms)
+            scale = round(scale, 4)
+        if scale != self.execution_scale:
+            # Retained results were computed at another resolution
+            self.dirty_nodes.update(self.nodes)
+            self.execution_scale = scale
+        for node_instance in self.node_instances.values():
+            node_instance.resolution_scale = scale
+        return scale
+    
+    def _plan_execution(self, execution_order, wanted):
+        """Nodes that must run, in execution order: wanted nodes without a valid result,
+        and transitively whatever feeds them that has no valid result either"""
+        needed = set(wanted)
+        must_run = set()
+        for node_id in reversed(execution_order):
+            if node_id not in needed or node_id not in self.node_instances:
+                continue
+            if node_id in self.dirty_nodes or node_id not in self.node_results:
+                must_run.add(node_id)
+                for conn in self.get_node_inputs(node_id).values():
+                    needed.add(conn['from_node'])
+        return [node_id for node_id in execution_order if node_id in must_run]
+    
+    def _build_stages(self, to_run, wanted):
+        """Group the nodes to run into stages keyed by their last node.
+        
+        A stage is usually a single node. Chains of point nodes whose intermediate
+        results nobody asked for become one lookup-table stage, chains of frequency
+        nodes one stage with a single inverse transform, and with tiling enabled so
+        do chains of neighborhood nodes, as one tiled stage.
+        """
+        stages = {}
+        for node_id in to_run:
+            previous = self._fusable_predecessor(node_id, wanted)
+            if previous is not None and previous in stages:
+                stages[node_id] = stages.pop(previous) + [node_id]
+            else:
+                stages[node_id] = [node_id]
+        return stages
+    
+    def _fusable_predecessor(self, node_id, wanted):
+        """The node feeding node_id if the two can share a fused stage, else None"""
+        node_instance = self.node_instances.get(node_id)
+        # Frequency nodes chain on their spectra, the others on images
+        socket = 'fft' if isinstance(node_instance, FrequencyNode) else 'image'
+        node_inputs = self.get_node_inputs(node_id)
+        if list(node_inputs) != [socket] or node_inputs[socket]['from_socket'] != socket:
+            return None
+        previous = node_inputs[socket]['from_node']
+        if previous in wanted or len(self._outgoing.get(previous, ())) != 1:
+            return None
+        previous_instance = self.node_instances.get(previous)
+        if isinstance(node_instance, PointNode) and isinstance(previous_instance, PointNode):
+            return previous
+        if isinstance(node_instance, FrequencyNode) and isinstance(previous_instance, FrequencyNode):
+            return previous
+        if not self.tile_rows:
+            return None
+        if not isinstance(node_instance, NeighborhoodNode) or not isinstance(previous_instance, NeighborhoodNode):
+            return None
+        if previous_instance.global_finish:
+            return None
+        return previous
+    
+    def _execute_stage(self, stage, node_results):
+        """Run a stage; returns (node_id, result, cache_key, stats) for each node in it"""
+        if len(stage) == 1:
+            return [(stage[0],) + self._execute_node(stage[0], node_results)]
+        if isinstance(self.node_instances[stage[-1]], PointNode):
+            return self._execute_fused_chain(stage, node_results, 'point chain', self._run_point_chain)
+        if isinstance(self.node_instances[stage[-1]], FrequencyNode):
+            return self._execute_fused_chain(stage, node_results, 'frequency chain', self._run_frequency_chain, 'fft')
+        return self._execute_fused_chain(stage, node_results, 'tiled chain', self._run_tiled_chain)
+    
+    def _gather_inputs(self, node_id, node_results):
+        """Collect a node's input values and their content hashes"""
+        inputs = {}
+        input_hashes = {}
+        node_inputs = self.get_node_inputs(node_id)
+        logger.debug("Node %s inputs: %s", node_id, node_inputs)
+        
+        for socket_name, connection in node_inputs.items():
+            from_node = connection['from_node']
+            if from_node in node_results:
+                from_socket = connection['from_socket']
+                if from_socket in node_results[from_node]:
+                    inputs[socket_name] = node_results[from_node][from_socket]
+                    input_hashes[socket_name] = self.result_hashes[from_node].get(from_socket)
+                else:
+                    custom_print(f"  Warning: Socket {from_socket} not found in {from_node} results", level=logging.WARNING)
+            else:
+                custom_print(f"  Warning: Node {from_node} not found in results", level=logging.WARNING)
+        return inputs, input_hashes
+    
+    def _cache_key(self, node_id, input_hashes):
+        """Result cache key for a node, or None if its results must not be reused"""
+        node_instance = self.node_instances[node_id]
+        # Results of uncacheable nodes, and everything computed from them, can never be hit again
+        if not node_instance.cacheable or any(is_volatile(h) for h in input_hashes.values()):
+            return None
+        return make_key(self.nodes[node_id]['type'], node_instance.params,
+                        (node_instance.cache_token(), node_instance.resolution_scale), input_hashes)
+    
+    def _execute_node(self, node_id, node_results):
+        """Run a single node on its upstream results; returns (result, cache_key, stats)"""
+        node_instance = self.node_instances[node_id]
+        logger.debug("Processing node %s of type %s", node_id, node_instance.__class__.__name__)
+        wall_start = time.perf_counter()
+        cpu_start = time.thread_time()
+        
+        # Gather inputs and their content hashes
+        with trace_span(self._tracer, 'gather_inputs', node=node_id):
+            inputs, input_hashes = self._gather_inputs(node_id, node_results)
+        
+        # Reuse a cached result for identical type, params and inputs
+        result = None
+        with trace_span(self._tracer, 'cache_lookup', node=node_id):
+            cache_key = self._cache_key(node_id, input_hashes)
+            if cache_key is not None:
+                result = self.result_cache.get(cache_key)
+                if result is not None:
+                    logger.debug("  Cache hit for %s", node_id)
+        cache_state = 'uncached' if cache_key is None else ('hit' if result is not None else 'miss')
+        
+        # Process node
+        if result is None:
+            with trace_span(self._tracer, f"{self.nodes[node_id]['type']} {node_id}", 'process', node=node_id):
+                result = node_instance.process(inputs) or {}
+            if cache_key is not None:
+                self.result_cache.put(cache_key, result)
+        if cache_key is None:
+            cache_key = volatile_key()
+        stats = {
+            'wall_ms': (time.perf_counter() - wall_start) * 1000,
+            'cpu_ms': (time.thread_time() - cpu_start) * 1000,
+            'output_bytes': result_nbytes(result),
+            'cache': cache_state
+        }
+        if logger.isEnabledFor(logging.DEBUG):
+            image = result.get('image') if result else None
+            logger.debug("  %s: %.1f ms wall, %.1f ms cpu, cache %s, image %s", node_id, stats['wall_ms'],
+                         stats['cpu_ms'], cache_state, None if image is None else image.shape)
+        return result, cache_key, stats
+    
+    def _output_hashes(self, node_id, result, cache_key, node_results):
+        """Content hash of each output socket.
+        
+        An output that is one of the node's input buffers passed through unchanged
+        (e.g. Output) keeps that input's hash, so both are encoded and served once.
+        """
+        passed_through = {}
+        for conn in self.get_node_inputs(node_id).values():
+            value = node_results.get(conn['from_node'], {}).get(conn['from_socket'])
+            content_hash = self.result_hashes.get(conn['from_node'], {}).get(conn['from_socket'])
+            if isinstance(value, np.ndarray) and content_hash is not None:
+                passed_through[id(value)] = content_hash
+        return {socket: passed_through.get(id(value)) or output_hash(cache_key, socket)
+                for socket, value in result.items()}
+    
+    def _run_tiled_chain(self, instances, image):
+        """Stream an image through a chain of neighborhood nodes strip by strip"""
+        for node_instance in instances:
+            # Strips are transient buffers; caching products of them would only pin memory
+            node_instance.products = None
+        return instances[-1].build_result(run_tiled(instances, image, self.tile_rows))
+    
+    def _run_point_chain(self, instances, image):
+        """Map an image through a chain of point nodes as one composed lookup table"""
+        result = run_point_chain(instances, image)
+        if result is None:
+            # Not expressible as a uint8 table: run the nodes one after another
+            result = image
+            for node_instance in instances:
+                result = node_instance.process({'image': result})['image']
+        return {'image': result}
+    
+    def _run_frequency_chain(self, instances, spectrum):
+        """Combine the transfer functions of a chain of frequency nodes; only the tail transforms back"""
+        for node_instance in instances[:-1]:
+            spectrum = node_instance.filter_spectrum(spectrum)
+        return instances[-1].process({'fft': spectrum})
+    
+    def _execute_fused_chain(self, stage, node_results, kind, run_chain, socket='image'):
+        """Run a chain of nodes as one stage on the head's input socket, materializing only the tail's result"""
+        logger.debug("Processing %s %s", kind, stage)
+        wall_start = time.perf_counter()
+        cpu_start = time.thread_time()
+        with trace_span(self._tracer, 'gather_inputs', node=stage[0]):
+            inputs, input_hashes = self._gather_inputs(stage[0], node_results)
+        
+        # Content hashes only depend on params and inputs, so the whole chain's keys are known up front
+        outcomes = []
+        cacheable = True
+        for node_id in stage:
+            cache_key = self._cache_key(node_id, input_hashes)
+            if cache_key is None:
+                cacheable = False
+                cache_key = volatile_key()
+            outcomes.append((node_id, None, cache_key, {'cache': 'fused', 'output_bytes': 0}))
+            input_hashes = {socket: output_hash(cache_key, socket)}
+        
+        tail_id, _, tail_key, _ = outcomes[-1]
+        tail = self.node_instances[tail_id]
+        result = self.result_cache.get(tail_key) if cacheable else None
+        cache_state = 'uncached' if not cacheable else ('hit' if result is not None else 'miss')
+        if result is None:
+            value = inputs.get(socket)
+            if value is None:
+                result = tail.process({socket: None})
+            else:
+                instances = [self.node_instances[node_id] for node_id in stage]
+                with trace_span(self._tracer, f"{kind} {' > '.join(stage)}", 'process', nodes=list(stage)):
+                    result = run_chain(instances, value)
+            if cacheable:
+                self.result_cache.put(tail_key, result)
+        # The tail carries the cost of the whole chain
+        outcomes[-1] = (tail_id, result, tail_key, {
+            'wall_ms': (time.perf_counter() - wall_start) * 1000,
+            'cpu_ms': (time.thread_time() - cpu_start) * 1000,
+            'output_bytes': result_nbytes(result),
+            'cache': cache_state,
+            'fused': list(stage)
+        })
+        return outcomes
+    
     def update_node_params(self, node_id, params):
         """Update parameters for a specific node"""
         if node_id in self.node_instances:
             node_instance = self.node_instances[node_id]
+            # The frontend resends every node's params, so only real changes invalidate results
+            if all(name in node_instance.params and node_instance.params[name] == value
+                   for name, value in params.items()):
+                return
+            self.mark_dirty(node_id)
             node_instance.params.update(params)
-            custom_print(f"Updating node {node_id} with params: {params}")
+            logger.debug("Updating node %s with params: %s", node_id, params)
             
             # Update all possible node attributes based on parameter names
             for param_name, param_value in params.items():
                 if hasattr(node_instance, param_name):
                     # Ensure proper type conversion for specific parameters
-                    if param_name in ['min', 'max', 'threshold', 'low_threshold', 'high_threshold', 'bit_plane', 'kernel_size']:
+                    if param_name in ['min', 'max', 'threshold', 'low_threshold', 'high_threshold', 'bit_plane', 'kernel_size', 'order']:
                         param_value = int(param_value)
                     elif param_name in ['brightness', 'contrast', 'radius', 'intensity', 'salt_pepper_ratio', 'gamma', 'cutoff', 'boost']:
                         param_value = float(param_value)
                     elif param_name in ['highlight']:
                         param_value = bool(param_value)
+                    elif param_name == 'kernel':
+                        param_value = np.array(param_value)
                     
                     setattr(node_instance, param_name, param_value)
-                    custom_print(f"  Updated {param_name} = {param_value} (type: {type(param_value).__name__})")
+                    logger.debug("  Updated %s = %s (type: %s)", param_name, param_value, type(param_value).__name__)
                 
                 # Handle special parameter mappings
                 if param_name == 'threshold' and hasattr(node_instance, 'threshold_value'):
                     node_instance.threshold_value = param_value
-                    custom_print(f"  Updated threshold_value = {param_value}")
+                    logger.debug("  Updated threshold_value = %s", param_value)
                 elif param_name == 'type' and hasattr(node_instance, 'noise_type'):
                     node_instance.noise_type = param_value
-                    custom_print(f"  Updated noise_type = {param_value}")
+                    logger.debug("  Updated noise_type = %s", param_value)
                 elif param_name == 'type' and hasattr(node_instance, 'threshold_type'):
                     node_instance.threshold_type = param_value
-                    custom_print(f"  Updated threshold_type = {param_value}")
-                elif param_name == 'kernel' and hasattr(node_instance, 'kernel'):
-                    node_instance.kernel = np.array(param_value)
-                    custom_print(f"  Updated kernel = {param_value}")
+                    logger.debug("  Updated threshold_type = %s", param_value)
                 elif param_name == 'kernel_size' and hasattr(node_instance, 'kernel_size'):
                     node_instance.kernel_size = param_value
-                    custom_print(f"  Updated kernel_size = {param_value}")
+                    logger.debug("  Updated kernel_size = %s", param_value)
                 elif param_name == 'cutoff' and hasattr(node_instance, 'cutoff'):
                     node_instance.cutoff = param_value
-                    custom_print(f"  Updated cutoff = {param_value}")
+                    logger.debug("  Updated cutoff = %s", param_value)
                 elif param_name == 'boost' and hasattr(node_instance, 'boost'):
                     node_instance.boost = param_value
-                    custom_print(f"  Updated boost = {param_value}")
+                    logger.debug("  Updated boost = %s", param_value)
                 elif param_name == 'intensity' and hasattr(node_instance, 'intensity'):
                     node_instance.intensity = param_value
-                    custom_print(f"  Updated intensity = {param_value}")
+                    logger.debug("  Updated intensity = %s", param_value)
                 elif param_name == 'salt_pepper_ratio' and hasattr(node_instance, 'salt_pepper_ratio'):
                     node_instance.salt_pepper_ratio = param_value
-                    custom_print(f"  Updated salt_pepper_ratio = {param_value}")
+                    logger.debug("  Updated salt_pepper_ratio = %s", param_value)
                 elif param_name == 'bit_plane' and hasattr(node_instance, 'bit_plane'):
                     node_instance.bit_plane = param_value
-                    custom_print(f"  Updated bit_plane = {param_value}")
+                    logger.debug("  Updated bit_plane = %s", param_value)
                 elif param_name == 'mode' and hasattr(node_instance, 'mode'):
                     node_instance.mode = param_value
-                    custom_print(f"  Updated mode = {param_value}")
+                    logger.debug("  Updated mode = %s", param_value)
                 elif param_name == 'gamma' and hasattr(node_instance, 'gamma'):
                     node_instance.gamma = param_value
-                    custom_print(f"  Updated gamma = {param_value}")
+                    logger.debug("  Updated gamma = %s", param_value)
                 elif param_name == 'highlight' and hasattr(node_instance, 'highlight'):
                     node_instance.highlight = param_value
-                    custom_print(f"  Updated highlight = {param_value}")
+                    logger.debug("  Updated highlight = %s", param_value)
                 elif param_name == 'low_threshold' and hasattr(node_instance, 'low_threshold'):
                     node_instance.low_threshold = param_value
-                    custom_print(f"  Updated low_threshold = {param_value}")
+                    logger.debug("  Updated low_threshold = %s", param_value)
                 elif param_name == 'high_threshold' and hasattr(node_instance, 'high_threshold'):
                     node_instance.high_threshold = param_value
-                    custom_print(f"  Updated high_threshold = {param_value}")
+                    logger.debug("  Updated high_threshold = %s", param_value)
             
             self.save_graph_state_to_disk()
     
     def get_graph_state(self):
         """Get the current state of the graph as JSON, including position and metadata"""
-        return {
-            'nodes': {
-                node_id: {
-                    'id': node['id'],
-                    'type': node['type'],
-                    'params': node.get('params', {}),
-                    'position': node.get('position', None),
-                    'metadata': node.get('metadata', {})
-                } for node_id, node in self.nodes.items()
-            },
-            'connections': self.connections
-        }
+        # Built under the engine lock, like executions, so no snapshot overlaps a run
+        with self._execution_lock:
+            return {
+                'nodes': {
+                    node_id: {
+                        'id': node['id'],
+                        'type': node['type'],
+                        'params': node.get('params', {}),
+                        'position': node.get('position', None),
+                        'metadata': node.get('metadata', {})
+                    } for node_id, node in self.nodes.items()
+                },
+                'connections': self.connections
+            }
     
-    def load_graph_state(self, state):
+    def load_graph_state(self, state, save=True):
         """Load graph state from JSON, clearing previous nodes/connections, and restoring position/metadata"""
+        with self.bulk_update():
+            self._load_graph_state(state)
+            if not save:
+                self._bulk_save_pending = False
+    
+    def _load_graph_state(self, state):
         self.nodes = {}
         self.connections = []
         self.node_instances = {}
+        self.node_results = {}
+        self.dirty_nodes = set()
+        self.result_hashes = {}
+        self._rebuild_connection_index()
         # Load new state
         for node_id, node_data in state.get('nodes', {}).items():
             node_type = node_data['type']
             params = node_data.get('params', {})
             position = node_data.get('position', None)
             metadata = node_data.get('metadata', {})
-            self.nodes[node_id] = {
-                'id': node_id,
-                'type': node_type,
-                'params': params,
-                'position': position,
-                'metadata': metadata
-            }
             self.add_node(node_id, node_type, params)
+            self.nodes[node_id]['position'] = position
+            self.nodes[node_id]['metadata'] = metadata
         self.connections = state.get('connections', [])
+        self._rebuild_connection_index()
+        self.dirty_nodes.update(self.nodes)
         self.save_graph_state_to_disk()
     
+    def merge_graph_state(self, state, save=True):
+        """Bring the graph to state by changing only what differs, keeping the results of unchanged nodes"""
+        with self.bulk_update():
+            self._merge_graph_state(state)
+            if not save:
+                self._bulk_save_pending = False
+    
+    def _merge_graph_state(self, state):
+        nodes = state.get('nodes', {})
+        for node_id in [node_id for node_id in self.nodes if node_id not in nodes]:
+            self.remove_node(node_id)
+        for node_id, node_data in nodes.items():
+            node_type = NODE_TYPE_MAP.get(node_data['type'], node_data['type'])
+            params = node_data.get('params', {})
+            current = self.nodes.get(node_id)
+            if current is None or current['type'] != node_type or not set(current['params']) <= set(params):
+                # New node, or one whose type changed or that lost params: build it afresh
+                if current is not None:
+                    self.remove_node(node_id)
+                self.add_node(node_id, node_type, params)
+            else:
+                changed = {name: value for name, value in params.items() if current['params'].get(name) != value}
+                if changed:
+                    self.update_node_params(node_id, changed)
+            self.nodes[node_id]['position'] = node_data.get('position', None)
+            self.nodes[node_id]['metadata'] = node_data.get('metadata', {})
+        self.set_connections(state.get('connections', []))
+    
     def set_connections(self, connections):
         """Set all connections at once, deduplicating them"""
         unique = []
@@ -475,22 +921,65 @@ class GraphEngine:
             if key not in seen:
                 seen.add(key)
                 unique.append(conn)
-        self.connections = unique 
+        # Nodes whose incoming edges changed are dirty
+        changed = self._connection_keys.symmetric_difference(seen)
+        if not changed:
+            return
+        self.connections = unique
+        self._rebuild_connection_index()
+        for key in changed:
+            self.mark_dirty(key[2])
+        self.save_graph_state_to_disk()
 
-    def save_graph_state_to_disk(self):
+    @contextmanager
+    def bulk_update(self):
+        """Group several mutations so the graph state is persisted once, when the outermost block exits"""
+        self._bulk_depth += 1
         try:
-            state = self.get_graph_state()
-            with open(self.state_file, 'w') as f:
-                json.dump(state, f)
-        except Exception as e:
-            custom_print(f"Error saving graph state: {e}")
+            yield
+        finally:
+            self._bulk_depth -= 1
+            if self._bulk_depth == 0 and self._bulk_save_pending:
+                self._bulk_save_pending = False
+                self.save_graph_state_to_disk()
+    
+    def save_graph_state_to_disk(self):
+        """Schedule a write-behind save of the graph state (see app.persistence.StateWriter)"""
+        if not self.persist:
+            return
+        if self._bulk_depth:
+            self._bulk_save_pending = True
+            return
+        self.state_writer.schedule()
+    
+    def flush_graph_state(self):
+        """Write pending graph state changes to disk now, e.g. on shutdown"""
+        if self.persist:
+            self.state_writer.flush()
 
-    def load_graph_state_from_disk(self):
+    def load_graph_state_from_disk(self, incremental=False):
+        """Load the state file; incremental merges it into the current graph (see merge_graph_state)"""
         try:
             if os.path.exists(self.state_file):
                 with open(self.state_file, 'r') as f:
                     state = json.load(f)
-                self.load_graph_state(state)
+                # The file already holds this state, so loading it does not write it back
+                if incremental:
+                    self.merge_graph_state(state, save=False)
+                else:
+                    self.load_graph_state(state, save=False)
+                self.state_writer.mark_saved()
                 custom_print("Graph state loaded from disk.")
         except Exception as e:
-            custom_print(f"Error loading graph state: {e}") 
\ No newline at end of file
+            custom_print(f"Error loading graph state: {e}")
+    
+    def close(self):
+        """Flush pending state and release the engine's threads and retained results"""
+        self.flush_graph_state()
+        if self.persist:
+            atexit.unregister(self.flush_graph_state)
+        if self._owns_scheduler:
+            self.scheduler.shutdown()
+        self.node_results = {}
+        if self._owns_cache:
+            self.result_cache.clear()
@@ -0,0 +1,185 @@
+import fcntl
+import hashlib
+import os
+import tempfile
+import threading
+import weakref
+from contextlib import contextmanager
+from urllib.parse import quote
+import numpy as np
+from app import custom_print
+
+
+def default_store_dir():
+    """IMAGE_STORE_DIR, else a directory in /dev/shm (POSIX shared memory) when available"""
+    configured = os.environ.get('IMAGE_STORE_DIR')
+    if configured:
+        return configured
+    base = '/dev/shm' if os.path.isdir('/dev/shm') else tempfile.gettempdir()
+    return os.path.join(base, 'node_editor_images')
+
+
+def content_id(image):
+    """Content id of an array: a hash of its dtype, shape and pixels"""
+    digest = hashlib.blake2b(digest_size=16)
+    digest.update(f"{image.dtype.str}{image.shape}".encode('utf-8'))
+    digest.update(np.ascontiguousarray(image).data)
+    return digest.hexdigest()
+
+
+class ImageStore:
+    """Content-addressed image arrays shared between processes without copies.
+
+    Each image is an .npy file in a directory on shared memory (/dev/shm) that
+    every process memory-maps, so get() returns a zero-copy view of the same
+    physical pages. Images are reference counted by named holders (e.g.
+    'session/node'): adding the same holder twice counts once, and when the last
+    holder releases an image its file is deleted. Mappings that are already open
+    stay valid after deletion. A process keeps its mappings only while something
+    uses them, and does not hand out a mapping whose file another process has
+    deleted, so the shared memory is freed once the last user lets go.
+    """
+
+    def __init__(self, root=None):
+        self.root = root or default_store_dir()
+        os.makedirs(os.path.join(self.root, 'refs'), exist_ok=True)
+        # Process-local mappings by content id, dropped when no longer referenced
+        self._views = weakref.WeakValueDictionary()
+        self._views_lock = threading.Lock()
+
+    def _data_path(self, image_id):
+        return os.path.join(self.root, f"{image_id}.npy")
+
+    def _refs_dir(self, image_id):
+        return os.path.join(self.root, 'refs', image_id)
+
+    @contextmanager
+    def _locked(self):
+        """Store-wide lock across processes for reference changes"""
+        with open(os.path.join(self.root, '.lock'), 'a') as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def put(self, image, holder, image_id=None):
+        """Store an image (if not already stored) and add a reference from holder; returns its content id"""
+        image_id = image_id or content_id(image)
+        with self._locked():
+            path = self._data_path(image_id)
+            if not os.path.exists(path):
+                fd, temp_path = tempfile.mkstemp(dir=self.root, prefix='.tmp.')
+                try:
+                    with os.fdopen(fd, 'wb') as f:
+                        np.save(f, np.ascontiguousarray(image))
+                    os.replace(temp_path, path)
+                except BaseException:
+                    if os.path.exists(temp_path):
+                        os.remove(temp_path)
+                    raise
+            self._add_ref(image_id, holder)
+        return image_id
+
+    def add_ref(self, image_id, holder):
+        """Add a reference from holder to an image that is already stored"""
+        with self._locked():
+            if not os.path.exists(self._data_path(image_id)):
+                raise KeyError(image_id)
+            self._add_ref(image_id, holder)
+
+    def _add_ref(self, image_id, holder):
+        refs_dir = self._refs_dir(image_id)
+        os.makedirs(refs_dir, exist_ok=True)
+        open(os.path.join(refs_dir, quote(holder, safe='')), 'a').close()
+
+    def release(self, image_id, holder):
+        """Drop holder's reference; the image is deleted when no references remain"""
+        with self._locked():
+            refs_dir = self._refs_dir(image_id)
+            try:
+                os.remove(os.path.join(refs_dir, quote(holder, safe='')))
+            except FileNotFoundError:
+                pass
+            if not os.path.isdir(refs_dir) or not os.listdir(refs_dir):
+                self._delete(image_id)
+
+    def release_holder_prefix(self, prefix):
+        """Drop every reference whose holder starts with prefix, e.g. all of a session's"""
+        quoted = quote(prefix, safe='')
+        with self._locked():
+            for image_id in os.listdir(os.path.join(self.root, 'refs')):
+                refs_dir = self._refs_dir(image_id)
+                for holder in os.listdir(refs_dir):
+                    if holder.startswith(quoted):
+                        os.remove(os.path.join(refs_dir, holder))
+                if not os.listdir(refs_dir):
+                    self._delete(image_id)
+
+    def refcount(self, image_id):
+        try:
+            return len(os.listdir(self._refs_dir(image_id)))
+        except FileNotFoundError:
+            return 0
+
+    def _delete(self, image_id):
+        """Remove an unreferenced image; caller holds the store lock"""
+        path = self._data_path(image_id)
+        if os.path.exists(path):
+            os.remove(path)
+        refs_dir = self._refs_dir(image_id)
+        if os.path.isdir(refs_dir):
+            os.rmdir(refs_dir)
+        self._drop_views(image_id)
+
+    def _drop_views(self, image_id):
+        with self._views_lock:
+            for mode in ('r', 'c'):
+                self._views.pop((image_id, mode), None)
+
+    def get(self, image_id, writable=False):
+        """Zero-copy view of a stored image.
+
+        Views are read-only by default; writable=True maps copy-on-write, so writes
+        stay private to this process. Raises KeyError if the image is not stored.
+        """
+        mode = 'c' if writable else 'r'
+        with self._views_lock:
+            view = self._views.get((image_id, mode))
+        if view is not None:
+            if os.path.exists(self._data_path(image_id)):
+                return view
+            # Deleted by another process
+            self._drop_views(image_id)
+            raise KeyError(image_id)
+        try:
+            view = np.load(self._data_path(image_id), mmap_mode=mode)
+        except FileNotFoundError:
+            raise KeyError(image_id)
+        with self._views_lock:
+            self._views[(image_id, mode)] = view
+        return view
+
+    def __contains__(self, image_id):
+        return os.path.exists(self._data_path(image_id))
+
+    def sweep(self):
+        """Delete images without references and temp files left by interrupted writes"""
+        removed = 0
+        # Forget mappings of images other processes deleted
+        with self._views_lock:
+            stale = {image_id for image_id, _ in self._views.keys()
+                     if not os.path.exists(self._data_path(image_id))}
+        for image_id in stale:
+            self._drop_views(image_id)
+        with self._locked():
+            for name in os.listdir(self.root):
+                path = os.path.join(self.root, name)
+                if name.startswith('.tmp.'):
+                    os.remove(path)
+                elif name.endswith('.npy') and self.refcount(name[:-4]) == 0:
+                    self._delete(name[:-4])
+                    removed += 1
+        if removed:
+            custom_print(f"Image store: removed {removed} unreferenced images")
+        return removed
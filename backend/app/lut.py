@@ -0,0 +1,45 @@
+import cv2
+import numpy as np
+from . import derived
+
+IDENTITY = np.arange(256, dtype=np.uint8)
+
+
+def apply_lut(image, table):
+    """Map every value of a uint8 image through a 256-entry table in one pass"""
+    if image.ndim == 2 or (image.ndim == 3 and image.shape[2] in (3, 4)):
+        return cv2.LUT(image, table)
+    return table[image]
+
+
+def run_point_chain(nodes, image):
+    """Apply a chain of PointNodes to a uint8 image with one composed lookup table.
+
+    Each node's table is composed into the running one, so the chain costs a
+    single pass over the pixels, plus a histogram pass when a node's map depends
+    on the values present (e.g. normalizing by the maximum). A color image that
+    reaches a grayscale node is mapped and converted there and the rest of the
+    chain continues on the gray image. Returns None if the chain cannot be
+    expressed as a table (non-uint8 input or output).
+    """
+    if image.dtype != np.uint8:
+        return None
+    table = IDENTITY
+    values = None
+    for node in nodes:
+        if node.grayscale and image.ndim == 3:
+            # Luminance of the chain's input is shared with other consumers, that of a mapped image is not
+            image = node.luminance(image) if table is IDENTITY else derived.luminance(apply_lut(image, table))
+            table = IDENTITY
+            values = None
+        if node.value_dependent:
+            if values is None:
+                values = node.present_values(image)
+            # Values present after the nodes composed so far
+            lut = node.lut(np.unique(table[values]))
+        else:
+            lut = node.lut()
+        if lut is None:
+            return None
+        table = lut[table]
+    return apply_lut(image, table)
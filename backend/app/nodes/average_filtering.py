@@ -1,20 +1,26 @@
 import numpy as np
 import cv2
-from .base import BaseNode
+from .base import NeighborhoodNode
 
-class AverageFilteringNode(BaseNode):
-    def process(self, inputs):
-        image = inputs.get('image')
+class AverageFilteringNode(NeighborhoodNode):
+    def get_kernel_size(self):
         kernel_size = int(self.params.get('kernel_size', 3))
-        if image is None:
-            return {'image': None, 'metadata': {}}
         # Ensure kernel size is odd and >= 3
         if kernel_size < 3:
             kernel_size = 3
         if kernel_size % 2 == 0:
             kernel_size += 1
-        filtered = cv2.blur(image, (kernel_size, kernel_size))
+        return self.scale_kernel_size(kernel_size, odd=True)
+
+    def get_halo(self):
+        return self.get_kernel_size() // 2
+
+    def filter_image(self, image):
+        kernel_size = self.get_kernel_size()
+        return cv2.blur(image, (kernel_size, kernel_size))
+
+    def build_result(self, image):
         return {
-            'image': filtered,
-            'metadata': self.get_metadata(filtered)
-        } 
\ No newline at end of file
+            'image': image,
+            'metadata': self.get_metadata(image)
+        }
@@ -7,8 +7,18 @@ import io
 import base64
 from abc import ABC, abstractmethod
 from app import custom_print
+from app.preview import encode_data_url
+from app.lut import IDENTITY, apply_lut
+from app import derived
 
 class BaseNode(ABC):
+    # Deterministic nodes can have their results reused from the result cache
+    cacheable = True
+    # Resolution of the current execution relative to the full-size inputs (< 1 for proxy previews)
+    resolution_scale = 1.0
+    # Registry of the current execution sharing luminance, histograms, gradients and spectra (see app.derived)
+    products = None
+
     def __init__(self, node_id, params=None):
         self.node_id = node_id
         self.params = params or {}
@@ -20,42 +30,54 @@ class BaseNode(ABC):
         """Process inputs and return outputs"""
         pass
     
+    def cache_token(self):
+        """State besides params and inputs that affects the output (None if there is none)"""
+        return None
+    
+    def scale_length(self, value):
+        """Rescale a length in pixels (radius, sigma, offset, cutoff) to the execution resolution"""
+        if self.resolution_scale == 1.0:
+            return value
+        return value * self.resolution_scale
+    
+    def scale_kernel_size(self, size, odd=False):
+        """Rescale a kernel size to the execution resolution, keeping it >= 1 and optionally odd"""
+        if self.resolution_scale == 1.0:
+            return size
+        size = max(1, int(round(size * self.resolution_scale)))
+        if odd and size % 2 == 0:
+            size += 1
+        return size
+    
+    def luminance(self, image):
+        """Grayscale version of an image (the image itself if it already is)"""
+        if len(image.shape) != 3:
+            return image
+        return derived.derive(self.products, 'luminance', image, derived.luminance)
+    
+    def histogram(self, image):
+        """Counts of the 256 values of a uint8 image"""
+        return derived.derive(self.products, 'histogram', image, derived.histogram)
+    
+    def present_values(self, image):
+        """The uint8 values that occur in an image, in ascending order"""
+        return np.flatnonzero(self.histogram(image)).astype(np.uint8)
+    
+    def gradients(self, gray):
+        """Sobel derivatives (along rows, along columns) of a grayscale image"""
+        return derived.derive(self.products, 'gradients', gray, derived.sobel_gradients)
+    
+    def spectrum(self, gray):
+        """Centered Fourier transform of a grayscale image"""
+        return derived.derive(self.products, 'spectrum', gray, derived.spectrum)
+    
     def validate_inputs(self, inputs):
         """Validate input data"""
         return True
     
     def image_to_base64(self, image):
-        """Convert numpy array to base64 string using PIL, not matplotlib"""
-        if image is None:
-            custom_print("Warning: image_to_base64 called with None image\n\n")
-            return None
-        try:
-            custom_print(f"Converting image to base64, shape: {image.shape}, dtype: {image.dtype}")
-            from PIL import Image
-            import io, base64
-            # Ensure image is uint8
-            if image.dtype != np.uint8:
-                if image.dtype in [np.float32, np.float64]:
-                    image = (image * 255).astype(np.uint8)
-                else:
-                    image = image.astype(np.uint8)
-            # Convert to PIL Image
-            if len(image.shape) == 2:
-                pil_image = Image.fromarray(image, mode='L')
-            else:
-                pil_image = Image.fromarray(image)
-            buffer = io.BytesIO()
-            pil_image.save(buffer, format='PNG')
-            buffer.seek(0)
-            img_str = base64.b64encode(buffer.getvalue()).decode()
-            result = f"data:image/png;base64,{img_str}"
-            custom_print(f"Base64 conversion successful, length: {len(result)}")
-            return result
-        except Exception as e:
-            custom_print(f"Error converting image to base64: {e}")
-            import traceback
-            traceback.print_exc()
-            return None
+        """Convert numpy array to a base64 preview data URL (see app.preview.PreviewOptions)"""
+        return encode_data_url(image)
     
     def get_metadata(self, image):
         """Get image metadata"""
@@ -68,4 +90,107 @@ class BaseNode(ABC):
             'min_value': float(np.min(image)),
             'max_value': float(np.max(image)),
             'mean': float(np.mean(image))
-        } 
\ No newline at end of file
+        }
+
+
+class PointNode(BaseNode):
+    """Node that maps every pixel value independently, like a tone curve.
+    
+    On uint8 images the map is evaluated once per possible value into a 256-entry
+    lookup table that is applied in one pass, and chains of point nodes are
+    composed into a single table; see app.lut.
+    """
+    # True when color input is converted to grayscale before the map
+    grayscale = False
+    # True when the map depends on which values occur in the image, e.g. normalizing by the maximum
+    value_dependent = False
+    # True when the map is a single vectorized operation, faster on its own than a table lookup
+    fast_map = False
+    
+    @abstractmethod
+    def map_values(self, image):
+        """The per-pixel map, applied to an image or to an array of uint8 values"""
+    
+    def lut(self, values=None):
+        """Table of the map for uint8 input, or None if it does not produce uint8.
+        
+        values are the input values that occur, required when value_dependent.
+        """
+        if values is None:
+            values = IDENTITY
+        mapped = self.map_values(values)
+        if mapped is None or mapped.dtype != np.uint8 or mapped.shape != values.shape:
+            return None
+        table = np.zeros(256, dtype=np.uint8)
+        table[values] = mapped
+        return table
+    
+    def process(self, inputs):
+        if 'image' not in inputs or inputs['image'] is None:
+            return {'image': None}
+        image = inputs['image']
+        if self.grayscale:
+            image = self.luminance(image)
+        if image.dtype == np.uint8 and not self.fast_map:
+            table = self.lut(self.present_values(image) if self.value_dependent else None)
+            if table is not None:
+                return {'image': apply_lut(image, table)}
+        return {'image': self.map_values(image)}
+
+
+class NeighborhoodNode(BaseNode):
+    """Node whose output pixels depend only on a bounded neighborhood of input pixels.
+    
+    Such nodes can be run on overlapping horizontal strips of a large image and the
+    strips stitched back together; see app.tiling.
+    """
+    # True when finish_image needs the whole frame, so the node can only end a tiled chain
+    global_finish = False
+    
+    @abstractmethod
+    def get_halo(self):
+        """Rows of context needed above and below each output row"""
+    
+    @abstractmethod
+    def filter_image(self, image):
+        """Filter an image or a strip of one"""
+    
+    def finish_image(self, image):
+        """Whole-image step applied after filtering, e.g. normalizing by the global maximum"""
+        return image
+    
+    def build_result(self, image):
+        """Package the filtered image as the node's outputs"""
+        return {'image': image}
+    
+    def process(self, inputs):
+        if 'image' not in inputs or inputs['image'] is None:
+            return self.build_result(None)
+        return self.build_result(self.finish_image(self.filter_image(inputs['image'])))
+
+
+class FrequencyNode(BaseNode):
+    """Node that filters a spectrum (see app.spectral.Spectrum) with a transfer function.
+    
+    Filtering only multiplies the node's transfer function into the spectrum's,
+    so the 'fft' output of a chain of frequency nodes carries one combined
+    transfer function. Spatial outputs invert it; in a fused chain only the last
+    node does (see GraphEngine._build_stages).
+    """
+    
+    @abstractmethod
+    def transfer(self, spectrum):
+        """The node's transfer function for a spectrum, laid out like spectrum.data"""
+    
+    def filter_spectrum(self, spectrum):
+        return spectrum.filtered(self.transfer(spectrum))
+    
+    def build_result(self, spectrum, inputs):
+        """Outputs for the filtered spectrum; inputs are the node's other inputs"""
+        image = None if spectrum is None else spectrum.to_image()
+        return {'fft': spectrum, 'image': image}
+    
+    def process(self, inputs):
+        if 'fft' not in inputs or inputs['fft'] is None:
+            return self.build_result(None, inputs)
+        return self.build_result(self.filter_spectrum(inputs['fft']), inputs)
@@ -1,18 +1,18 @@
 import numpy as np
-from .base import BaseNode
+from .base import PointNode
 
-class BrightnessContrastNode(BaseNode):
+class BrightnessContrastNode(PointNode):
+    # Whether values are rescaled from 0-255 depends on the image maximum
+    value_dependent = True
+    
     def __init__(self, node_id, params=None):
         super().__init__(node_id, params)
         self.brightness = params.get('brightness', 0.0)  # -1 to 1
         self.contrast = params.get('contrast', 1.0)      # 0.1 to 3.0
     
-    def process(self, inputs):
+    def map_values(self, image):
         """Adjust brightness and contrast of input image"""
-        if 'image' not in inputs or inputs['image'] is None:
-            return {'image': None, 'preview': None}
-        
-        image = inputs['image'].astype(np.float32)
+        image = image.astype(np.float32)
         
         # Normalize to 0-1 range
         if image.max() > 1.0:
@@ -30,7 +30,4 @@ class BrightnessContrastNode(BaseNode):
         # Convert back to 0-255 range
         image = (image * 255).astype(np.uint8)
         
-        return {
-            'image': image,
-            'preview': self.image_to_base64(image)
-        } 
\ No newline at end of file
+        return image
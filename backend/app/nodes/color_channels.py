@@ -9,7 +9,7 @@ class ColorChannelNode(BaseNode):
     def process(self, inputs):
         """Extract color channel from input image"""
         if 'image' not in inputs or inputs['image'] is None:
-            return {'image': None, 'preview': None}
+            return {'image': None}
         
         image = inputs['image']
         
@@ -25,13 +25,12 @@ class ColorChannelNode(BaseNode):
                 result = image[:, :, 2]
             elif self.channel == 'grayscale':
                 # Convert to grayscale
-                result = np.dot(image[..., :3], [0.299, 0.587, 0.114]).astype(np.uint8)
+                result = self.luminance(image)
             else:
                 result = image
         else:
             result = image
         
         return {
-            'image': result,
-            'preview': self.image_to_base64(result)
+            'image': result
         } 
\ No newline at end of file
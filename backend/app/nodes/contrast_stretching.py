@@ -1,22 +1,17 @@
 import numpy as np
-from .base import BaseNode
-from app import custom_print
+from .base import PointNode
+from app import custom_print, logger
 
-class ContrastStretchingNode(BaseNode):
+class ContrastStretchingNode(PointNode):
     def __init__(self, node_id, params=None):
         super().__init__(node_id, params)
         self.min = params.get('min', 0)
         self.max = params.get('max', 255)
 
-    def process(self, inputs):
-        custom_print(f"ContrastStretchingNode params: min={self.min}, max={self.max}\n")
-        if 'image' not in inputs or inputs['image'] is None:
-            return {'image': None, 'preview': None}
-        image = inputs['image'].astype(np.float32)
+    def map_values(self, image):
+        logger.debug("ContrastStretchingNode params: min=%s, max=%s", self.min, self.max)
+        image = image.astype(np.float32)
         # Stretch contrast
         result = (image - self.min) * (255.0 / (self.max - self.min))
         result = np.clip(result, 0, 255).astype(np.uint8)
-        return {
-            'image': result,
-            'preview': self.image_to_base64(result)
-        } 
\ No newline at end of file
+        return result
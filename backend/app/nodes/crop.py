@@ -12,18 +12,18 @@ class CropNode(BaseNode):
 
     def process(self, inputs):
         if 'image' not in inputs or inputs['image'] is None:
-            return {'image': None, 'preview': None}
+            return {'image': None}
         image = inputs['image']
         pil_image = Image.fromarray(image)
-        x = max(0, self.x)
-        y = max(0, self.y)
-        w = max(1, self.width)
-        h = max(1, self.height)
+        # Crop coordinates are in full-resolution pixels
+        x = max(0, int(round(self.scale_length(self.x))))
+        y = max(0, int(round(self.scale_length(self.y))))
+        w = max(1, int(round(self.scale_length(self.width))))
+        h = max(1, int(round(self.scale_length(self.height))))
         x2 = min(pil_image.width, x + w)
         y2 = min(pil_image.height, y + h)
         cropped = pil_image.crop((x, y, x2, y2))
         out_img = np.array(cropped)
         return {
-            'image': out_img,
-            'preview': self.image_to_base64(out_img)
+            'image': out_img
         } 
\ No newline at end of file
@@ -1,39 +1,85 @@
+import cv2
 import numpy as np
-from scipy.ndimage import convolve
-from .base import BaseNode
+from .base import NeighborhoodNode
+from app import logger
 
-class CustomKernelNode(BaseNode):
+DEFAULT_KERNEL = np.array([[0, -1, 0], [-1, 5, -1], [0, -1, 0]])
+# A kernel is separable when its second singular value is this small relative to the first
+SEPARABLE_TOLERANCE = 1e-6
+# Smaller kernels are as fast in one 2-D pass
+SEPARABLE_MIN_SIZE = 5
+# Input depths cv2.filter2D works on directly; anything else is converted to float32
+FILTER_DEPTHS = (np.uint8, np.uint16, np.int16, np.float32)
+
+
+class KernelPlan:
+    """How a convolution kernel is applied, decided once when the kernel is set.
+    
+    Rank-1 kernels (by SVD) of at least 5x5 run as a column and a row pass with cv2.sepFilter2D,
+    other kernels with cv2.filter2D, which switches to DFT-based block
+    correlation for large kernels by itself. Both work on all channels at once,
+    accumulate in float32 and reflect the border like scipy.ndimage.convolve.
+    """
+    
+    def __init__(self, kernel):
+        kernel = np.asarray(kernel, dtype=np.float32)
+        # OpenCV correlates; flipping the kernel makes it a convolution
+        self.kernel = np.ascontiguousarray(kernel[::-1, ::-1])
+        self.anchor = ((kernel.shape[1] - 1) // 2, (kernel.shape[0] - 1) // 2)
+        self.column = self.row = None
+        if min(kernel.shape) >= SEPARABLE_MIN_SIZE:
+            u, s, vt = np.linalg.svd(self.kernel.astype(np.float64))
+            if s[0] > 0 and s[1] <= SEPARABLE_TOLERANCE * s[0]:
+                self.column = (u[:, 0] * np.sqrt(s[0])).astype(np.float32)
+                self.row = (vt[0] * np.sqrt(s[0])).astype(np.float32)
+        self.method = 'filter2D' if self.row is None else 'separable'
+    
+    def apply(self, image):
+        """Convolve an image (any number of channels) with the kernel; returns float32"""
+        if image.dtype not in FILTER_DEPTHS:
+            image = image.astype(np.float32)
+        if self.method == 'separable':
+            return cv2.sepFilter2D(image, cv2.CV_32F, self.row, self.column, anchor=self.anchor,
+                                   borderType=cv2.BORDER_REFLECT)
+        return cv2.filter2D(image, cv2.CV_32F, self.kernel, anchor=self.anchor, borderType=cv2.BORDER_REFLECT)
+
+
+class CustomKernelNode(NeighborhoodNode):
     def __init__(self, node_id, params=None):
         super().__init__(node_id, params)
-        self.kernel = params.get('kernel', np.array([[0, -1, 0], [-1, 5, -1], [0, -1, 0]]))
+        self.kernel = params.get('kernel', DEFAULT_KERNEL)
         self.kernel_size = params.get('kernel_size', 3)
     
-    def process(self, inputs):
-        """Apply custom convolution kernel to input image"""
-        if 'image' not in inputs or inputs['image'] is None:
-            return {'image': None, 'preview': None}
-        
-        image = inputs['image']
-        
+    @property
+    def kernel(self):
+        return self._kernel
+    
+    @kernel.setter
+    def kernel(self, kernel):
+        # Parameter updates assign the kernel, so it is analyzed once here rather than on every run
+        self._kernel = np.asarray(kernel)
+        if self._kernel.ndim != 2:
+            # get_kernel replaces it with the default
+            self.plan = None
+            return
+        self.plan = KernelPlan(self._kernel)
+        logger.debug("CustomKernelNode %s: %s kernel, method %s", self.node_id, self._kernel.shape, self.plan.method)
+    
+    def get_kernel(self):
+        """Kernel to apply, falling back to the default when the size doesn't match"""
         # Ensure kernel is the right size
-        if self.kernel.shape[0] != self.kernel_size or self.kernel.shape[1] != self.kernel_size:
+        if self.kernel.ndim != 2 or self.kernel.shape != (self.kernel_size, self.kernel_size):
             # Create a default kernel if size doesn't match
-            self.kernel = np.array([[0, -1, 0], [-1, 5, -1], [0, -1, 0]])
-        
-        # Apply convolution
-        if len(image.shape) == 3:
-            # Color image - apply to each channel
-            result = np.zeros_like(image)
-            for i in range(image.shape[2]):
-                result[:, :, i] = convolve(image[:, :, i], self.kernel, mode='reflect')
-        else:
-            # Grayscale image
-            result = convolve(image, self.kernel, mode='reflect')
+            self.kernel = DEFAULT_KERNEL
+        return self.kernel
+    
+    def get_halo(self):
+        return max(self.get_kernel().shape) // 2
+    
+    def filter_image(self, image):
+        """Apply custom convolution kernel to input image"""
+        self.get_kernel()
+        result = self.plan.apply(image)
         
         # Clip to valid range
-        result = np.clip(result, 0, 255).astype(np.uint8)
-        
-        return {
-            'image': result,
-            'preview': self.image_to_base64(result)
-        } 
\ No newline at end of file
+        return np.clip(result, 0, 255, out=result).astype(np.uint8)
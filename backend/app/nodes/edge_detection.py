@@ -11,15 +11,10 @@ class EdgeDetectionNode(BaseNode):
     
     def sobel_edge_detection(self, image):
         """Apply Sobel edge detection"""
-        if len(image.shape) == 3:
-            # Convert to grayscale
-            gray = np.dot(image[..., :3], [0.299, 0.587, 0.114]).astype(np.uint8)
-        else:
-            gray = image
+        gray = self.luminance(image)
         
-        # Apply Sobel filters
-        sobel_x = sobel(gray, axis=1)
-        sobel_y = sobel(gray, axis=0)
+        # Apply Sobel filters (shared with other nodes on the same image)
+        sobel_y, sobel_x = self.gradients(gray)
         
         # Calculate magnitude
         magnitude = np.sqrt(sobel_x**2 + sobel_y**2)
@@ -31,15 +26,11 @@ class EdgeDetectionNode(BaseNode):
     
     def canny_edge_detection(self, image):
         """Apply Canny edge detection"""
-        if len(image.shape) == 3:
-            # Convert to grayscale
-            gray = np.dot(image[..., :3], [0.299, 0.587, 0.114]).astype(np.uint8)
-        else:
-            gray = image
+        gray = self.luminance(image)
         
         # Apply Gaussian blur
         from scipy.ndimage import gaussian_filter
-        blurred = gaussian_filter(gray, sigma=1)
+        blurred = gaussian_filter(gray, sigma=self.scale_length(1))
         
         # Apply Sobel filters
         sobel_x = sobel(blurred, axis=1)
@@ -65,7 +56,7 @@ class EdgeDetectionNode(BaseNode):
     def process(self, inputs):
         """Apply edge detection to input image"""
         if 'image' not in inputs or inputs['image'] is None:
-            return {'image': None, 'preview': None}
+            return {'image': None}
         
         image = inputs['image']
         
@@ -77,6 +68,5 @@ class EdgeDetectionNode(BaseNode):
             result = image
         
         return {
-            'image': result,
-            'preview': self.image_to_base64(result)
+            'image': result
         } 
\ No newline at end of file
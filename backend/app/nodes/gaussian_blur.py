@@ -1,30 +1,25 @@
+import cv2
 import numpy as np
-from scipy.ndimage import gaussian_filter
-from .base import BaseNode
+from .base import NeighborhoodNode
+from app.blur import gaussian_blur
 
-class GaussianBlurNode(BaseNode):
+class GaussianBlurNode(NeighborhoodNode):
     def __init__(self, node_id, params=None):
         super().__init__(node_id, params)
         self.radius = params.get('radius', 1.0)
     
-    def process(self, inputs):
+    def get_sigma(self):
+        return self.scale_length(self.radius)
+    
+    def get_halo(self):
+        # The kernel is truncated at 4 sigma (see app.blur.gaussian_blur)
+        return int(4.0 * float(self.get_sigma()) + 0.5)
+    
+    def filter_image(self, image):
         """Apply Gaussian blur to input image"""
-        if 'image' not in inputs or inputs['image'] is None:
-            return {'image': None, 'preview': None}
-        
-        image = inputs['image']
+        sigma = self.get_sigma()
         
-        # Apply Gaussian blur
-        if len(image.shape) == 3:
-            # Color image - blur each channel
-            blurred = np.zeros_like(image)
-            for i in range(image.shape[2]):
-                blurred[:, :, i] = gaussian_filter(image[:, :, i], sigma=self.radius)
-        else:
-            # Grayscale image
-            blurred = gaussian_filter(image, sigma=self.radius)
+        # Apply Gaussian blur to all channels at once, with scipy.ndimage's 'reflect' border
+        blurred = gaussian_blur(image, float(sigma), border=cv2.BORDER_REFLECT)
         
-        return {
-            'image': blurred.astype(np.uint8),
-            'preview': self.image_to_base64(blurred.astype(np.uint8))
-        } 
\ No newline at end of file
+        return blurred.astype(np.uint8, copy=False)
\ No newline at end of file
@@ -1,6 +1,7 @@
 import numpy as np
 import cv2
 from .base import BaseNode
+from app.blur import gaussian_blur
 
 class GaussianKernelNode(BaseNode):
     def process(self, inputs):
@@ -14,7 +15,8 @@ class GaussianKernelNode(BaseNode):
             kernel_size = 3
         if kernel_size % 2 == 0:
             kernel_size += 1
-        filtered = cv2.GaussianBlur(image, (kernel_size, kernel_size), sigma)
+        kernel_size = self.scale_kernel_size(kernel_size, odd=True)
+        filtered = gaussian_blur(image, self.scale_length(sigma), kernel_size)
         return {
             'image': filtered,
             'metadata': self.get_metadata(filtered)
@@ -13,6 +13,8 @@ class GLCMNode(BaseNode):
         # Convert to grayscale if needed
         if image.ndim == 3:
             image = np.mean(image, axis=2).astype(np.uint8)
+        # Pixel-pair distances shrink with the execution resolution
+        distances = [max(1, int(round(self.scale_length(d)))) for d in distances]
         # Quantize image to the specified number of levels
         image = np.floor(image / (256 / levels)).astype(np.uint8)
         # Convert angles from degrees to radians
@@ -24,6 +26,5 @@ class GLCMNode(BaseNode):
         return {
             'glcm': glcm,
             'image': glcm_img,
-            'preview': self.image_to_base64(glcm_img),
             'metadata': {'shape': glcm.shape, 'levels': levels, 'distances': distances, 'angles': angles_deg}
         } 
\ No newline at end of file
@@ -8,7 +8,8 @@ class HighBoostFilteringNode(BaseNode):
         factor = float(self.params.get('factor', 1.5))
         if image is None:
             return {'image': None, 'metadata': {}}
-        blurred = cv2.GaussianBlur(image, (5, 5), 1.0)
+        ksize = self.scale_kernel_size(5, odd=True)
+        blurred = cv2.GaussianBlur(image, (ksize, ksize), self.scale_length(1.0))
         mask = cv2.subtract(image, blurred)
         high_boost = cv2.add(image, cv2.multiply(mask, factor))
         high_boost = np.clip(high_boost, 0, 255).astype(np.uint8)
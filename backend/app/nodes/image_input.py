@@ -1,42 +1,133 @@
 import numpy as np
+import cv2
 from PIL import Image
 import io
+import logging
+import os
 from .base import BaseNode
-from app import custom_print
+from app import custom_print, logger
+from app.result_cache import ResultCache, hash_bytes
+
+# Full-resolution decodes by content hash of the encoded file, shared by all input nodes
+decoded_cache = ResultCache(int(float(os.environ.get('DECODED_CACHE_MAX_MB', 256)) * 1024 * 1024))
 
 class ImageInputNode(BaseNode):
     def __init__(self, node_id, params=None):
         super().__init__(node_id, params)
+        # Full-resolution image; None until decoded when only a reduced draft was needed
         self.image_data = None
         self.metadata = {}
+        self.content_hash = None
+        self.image_shape = None
+        self._draft = None
+        self._encoded = None
+        self._proxies = {}
+    
+    def set_image(self, image_file, max_side=None):
+        """Set image from uploaded file.
+        
+        With max_side (the proxy resolution), JPEGs are decoded at a reduced size
+        that still covers it and the full decode is deferred until it is needed.
+        """
+        return self.set_encoded(image_file.read(), max_side)
     
-    def set_image(self, image_file):
-        """Set image from uploaded file"""
+    def set_encoded(self, data, max_side=None):
+        """Set image from the bytes of an encoded image file"""
         try:
-            # Read image using PIL
-            image = Image.open(io.BytesIO(image_file.read()))
+            content_hash = hash_bytes(data)
+            cached = decoded_cache.get(content_hash)
+            if cached is not None:
+                logger.debug("Decoded image cache hit for %s", self.node_id)
+                self.set_decoded(cached[0], content_hash, cached[1])
+                return True
             
-            # Convert to numpy array
-            self.image_data = np.array(image)
-            
-            # Get metadata
-            self.metadata = {
+            # Read image using PIL
+            image = Image.open(io.BytesIO(data))
+            width, height = image.size
+            metadata = {
                 'format': image.format,
                 'mode': image.mode,
-                'size': image.size,
-                'shape': self.image_data.shape,
-                'dtype': str(self.image_data.dtype)
+                'size': image.size
             }
             
+            draft = None
+            if max_side and image.format == 'JPEG' and max(width, height) > max_side:
+                # Let libjpeg decode at 1/2, 1/4 or 1/8 scale, the smallest still >= max_side
+                factor = max(width, height) / max_side
+                image.draft(image.mode, (int(np.ceil(width / factor)), int(np.ceil(height / factor))))
+                draft = np.array(image)
+                if draft.shape[:2] == (height, width):
+                    draft = None
+            
+            if draft is None:
+                # Convert to numpy array
+                full = np.array(image)
+                metadata['shape'] = full.shape
+                metadata['dtype'] = str(full.dtype)
+                decoded_cache.put(content_hash, (full, metadata))
+                self.set_decoded(full, content_hash, metadata)
+            else:
+                metadata['shape'] = (height, width) + draft.shape[2:]
+                metadata['dtype'] = str(draft.dtype)
+                self.set_decoded(None, content_hash, metadata)
+                self._draft = draft
+                self._encoded = data
             return True
         except Exception as e:
-            custom_print(f"Error loading image: {e}")
+            custom_print(f"Error loading image: {e}", level=logging.ERROR)
             return False
     
+    def set_decoded(self, image, content_hash, metadata):
+        """Use an image decoded elsewhere, e.g. by another worker process"""
+        self.image_data = image
+        self.content_hash = content_hash
+        self.metadata = metadata
+        self.image_shape = tuple(metadata['shape']) if image is None else image.shape
+        self._draft = None
+        self._encoded = None
+        self._proxies = {}
+    
+    @property
+    def encoded_data(self):
+        """Bytes of the encoded file while the full-resolution decode is still deferred"""
+        return self._encoded
+    
+    def get_full_image(self):
+        """The full-resolution image, decoding it now if only a draft was decoded"""
+        if self.image_data is None and self._encoded is not None:
+            custom_print(f"Decoding full-resolution image for {self.node_id}")
+            full = np.array(Image.open(io.BytesIO(self._encoded)))
+            decoded_cache.put(self.content_hash, (full, self.metadata))
+            self.image_data = full
+            self._draft = None
+            self._encoded = None
+        return self.image_data
+    
+    def cache_token(self):
+        return self.content_hash
+    
+    def get_image(self):
+        """The loaded image at the current execution resolution"""
+        if self.image_shape is None:
+            return None
+        if self.resolution_scale >= 1.0:
+            return self.get_full_image()
+        scale = self.resolution_scale
+        if scale not in self._proxies:
+            height, width = self.image_shape[:2]
+            size = (max(1, int(round(width * scale))), max(1, int(round(height * scale))))
+            # A draft decode is used when it has at least the proxy's resolution
+            source = self._draft
+            if source is None or source.shape[1] < size[0] or source.shape[0] < size[1]:
+                source = self.get_full_image()
+            # Area interpolation averages the pixels a proxy pixel covers, like a real downsample
+            self._proxies = {scale: cv2.resize(source, size, interpolation=cv2.INTER_AREA)}
+        return self._proxies[scale]
+    
     def process(self, inputs):
         """Return the loaded image and metadata"""
+        image = self.get_image()
         return {
-            'image': self.image_data,
-            'metadata': self.metadata,
-            'preview': self.image_to_base64(self.image_data) if self.image_data is not None else None
-        } 
\ No newline at end of file
+            'image': image,
+            'metadata': self.metadata
+        }
@@ -1,17 +1,13 @@
 import numpy as np
-from .base import BaseNode
+from .base import PointNode
 from app import custom_print
 
-class ImageNegationNode(BaseNode):
+class ImageNegationNode(PointNode):
+    # 255 - image is cheaper than a lookup unless fused with other point nodes
+    fast_map = True
+
     def __init__(self, node_id, params=None):
         super().__init__(node_id, params)
 
-    def process(self, inputs):
-        if 'image' not in inputs or inputs['image'] is None:
-            return {'image': None, 'preview': None}
-        image = inputs['image']
-        result = 255 - image
-        return {
-            'image': result,
-            'preview': self.image_to_base64(result)
-        } 
\ No newline at end of file
+    def map_values(self, image):
+        return 255 - image
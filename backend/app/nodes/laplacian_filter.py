@@ -1,23 +1,16 @@
 import numpy as np
 from scipy.ndimage import laplace
-from .base import BaseNode
+from .base import NeighborhoodNode
 from app import custom_print
 
-class LaplacianFilterNode(BaseNode):
+class LaplacianFilterNode(NeighborhoodNode):
     def __init__(self, node_id, params=None):
         super().__init__(node_id, params)
 
-    def process(self, inputs):
-        if 'image' not in inputs or inputs['image'] is None:
-            return {'image': None, 'preview': None}
-        image = inputs['image']
-        if len(image.shape) == 3:
-            gray = np.dot(image[..., :3], [0.299, 0.587, 0.114]).astype(np.uint8)
-        else:
-            gray = image
+    def get_halo(self):
+        return 1
+
+    def filter_image(self, image):
+        gray = self.luminance(image)
         result = laplace(gray)
-        result = np.clip(result, 0, 255).astype(np.uint8)
-        return {
-            'image': result,
-            'preview': self.image_to_base64(result)
-        } 
\ No newline at end of file
+        return np.clip(result, 0, 255).astype(np.uint8)
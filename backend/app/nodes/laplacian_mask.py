@@ -13,6 +13,7 @@ class LaplacianMaskNode(BaseNode):
             kernel_size = 3
         if kernel_size % 2 == 0:
             kernel_size += 1
+        kernel_size = self.scale_kernel_size(kernel_size, odd=True)
         filtered = cv2.Laplacian(image, cv2.CV_64F, ksize=kernel_size)
         filtered = np.clip(filtered, 0, 255).astype(np.uint8)
         return {
@@ -1,17 +1,18 @@
 import numpy as np
-from .base import BaseNode
+from .base import PointNode
 from app import custom_print
 
-class LogPowerLawNode(BaseNode):
+class LogPowerLawNode(PointNode):
+    # The result is normalized by its maximum
+    value_dependent = True
+
     def __init__(self, node_id, params=None):
         super().__init__(node_id, params)
         self.mode = params.get('mode', 'log')
         self.gamma = params.get('gamma', 1.0)
 
-    def process(self, inputs):
-        if 'image' not in inputs or inputs['image'] is None:
-            return {'image': None, 'preview': None}
-        image = inputs['image'].astype(np.float32)
+    def map_values(self, image):
+        image = image.astype(np.float32)
         image = image / 255.0
         if self.mode == 'log':
             c = 1.0
@@ -21,7 +22,4 @@ class LogPowerLawNode(BaseNode):
             result = c * np.power(image, self.gamma)
         result = np.clip(result / result.max(), 0, 1)
         result = (result * 255).astype(np.uint8)
-        return {
-            'image': result,
-            'preview': self.image_to_base64(result)
-        } 
\ No newline at end of file
+        return result
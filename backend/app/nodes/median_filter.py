@@ -1,24 +1,40 @@
+import cv2
 import numpy as np
 from scipy.ndimage import median_filter
-from .base import BaseNode
+from .base import NeighborhoodNode
 from app import custom_print
 
-class MedianFilterNode(BaseNode):
+# Depths cv2.medianBlur accepts for 3x3 and 5x5 kernels; larger kernels need uint8
+SMALL_KERNEL_DEPTHS = (np.uint8, np.uint16, np.int16, np.float32)
+
+
+def median_blur(image, size):
+    """Median of every size x size neighborhood of each channel, borders reflected like scipy.ndimage.
+
+    cv2.medianBlur filters all channels of a uint8 image in one pass, with a
+    constant-time histogram algorithm for large kernels; 16-bit and float32
+    images only for 3x3 and 5x5. Reflecting a margin around the image first
+    makes its result identical to scipy.ndimage.median_filter, which handles
+    everything else (even sizes, other dtypes and channel counts).
+    """
+    supported = image.dtype == np.uint8 or (size <= 5 and image.dtype in SMALL_KERNEL_DEPTHS)
+    if supported and size > 1 and size % 2 == 1 and (image.ndim == 2 or image.shape[2] in (3, 4)):
+        half = size // 2
+        padded = cv2.copyMakeBorder(image, half, half, half, half, cv2.BORDER_REFLECT)
+        return cv2.medianBlur(padded, size)[half:-half, half:-half]
+    return median_filter(image, size=(size, size) + (1,) * (image.ndim - 2))
+
+
+class MedianFilterNode(NeighborhoodNode):
     def __init__(self, node_id, params=None):
         super().__init__(node_id, params)
         self.kernel_size = params.get('kernel_size', 3)
 
-    def process(self, inputs):
-        if 'image' not in inputs or inputs['image'] is None:
-            return {'image': None, 'preview': None}
-        image = inputs['image']
-        if len(image.shape) == 3:
-            result = np.zeros_like(image)
-            for i in range(image.shape[2]):
-                result[:, :, i] = median_filter(image[:, :, i], size=self.kernel_size)
-        else:
-            result = median_filter(image, size=self.kernel_size)
-        return {
-            'image': result,
-            'preview': self.image_to_base64(result)
-        } 
\ No newline at end of file
+    def get_kernel_size(self):
+        return self.scale_kernel_size(self.kernel_size, odd=True)
+
+    def get_halo(self):
+        return int(self.get_kernel_size()) // 2
+
+    def filter_image(self, image):
+        return median_blur(image, int(self.get_kernel_size()))
@@ -2,6 +2,9 @@ import numpy as np
 from .base import BaseNode
 
 class NoiseNode(BaseNode):
+    # Random output: every execution must draw fresh noise
+    cacheable = False
+
     def __init__(self, node_id, params=None):
         super().__init__(node_id, params)
         self.noise_type = params.get('type', 'gaussian')  # gaussian, salt_pepper, uniform
@@ -37,7 +40,7 @@ class NoiseNode(BaseNode):
     def process(self, inputs):
         """Add noise to input image"""
         if 'image' not in inputs or inputs['image'] is None:
-            return {'image': None, 'preview': None}
+            return {'image': None}
         
         image = inputs['image']
         
@@ -51,6 +54,5 @@ class NoiseNode(BaseNode):
             result = image
         
         return {
-            'image': result,
-            'preview': self.image_to_base64(result)
+            'image': result
         } 
\ No newline at end of file
@@ -7,20 +7,11 @@ class OutputNode(BaseNode):
     
     def process(self, inputs):
         """Display the final processed image"""
-        # Accept either 'image' or 'preview' from inputs
         image = inputs.get('image')
-        preview = inputs.get('preview')
-        if image is None and preview is not None:
-            # If only preview is available, use it for display
-            return {
-                'image': None,
-                'preview': preview,
-                'metadata': None
-            }
         if image is None:
-            return {'image': None, 'preview': None}
+            return {'image': None}
+        # Pass the upstream buffer through unchanged so it is encoded only once per response
         return {
             'image': image,
-            'preview': self.image_to_base64(image),
             'metadata': self.get_metadata(image)
-        } 
\ No newline at end of file
+        }
@@ -9,13 +9,12 @@ class ResizeBiggerNode(BaseNode):
 
     def process(self, inputs):
         if 'image' not in inputs or inputs['image'] is None:
-            return {'image': None, 'preview': None}
+            return {'image': None}
         image = inputs['image']
         pil_image = Image.fromarray(image)
         new_size = (int(pil_image.width * self.scale), int(pil_image.height * self.scale))
         resized = pil_image.resize(new_size, Image.BICUBIC)
         out_img = np.array(resized)
         return {
-            'image': out_img,
-            'preview': self.image_to_base64(out_img)
+            'image': out_img
         } 
\ No newline at end of file
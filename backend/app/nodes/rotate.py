@@ -9,12 +9,11 @@ class RotateNode(BaseNode):
 
     def process(self, inputs):
         if 'image' not in inputs or inputs['image'] is None:
-            return {'image': None, 'preview': None}
+            return {'image': None}
         image = inputs['image']
         pil_image = Image.fromarray(image)
         rotated = pil_image.rotate(self.angle, expand=True)
         out_img = np.array(rotated)
         return {
-            'image': out_img,
-            'preview': self.image_to_base64(out_img)
+            'image': out_img
         } 
\ No newline at end of file
@@ -10,13 +10,12 @@ class StretchNode(BaseNode):
 
     def process(self, inputs):
         if 'image' not in inputs or inputs['image'] is None:
-            return {'image': None, 'preview': None}
+            return {'image': None}
         image = inputs['image']
         pil_image = Image.fromarray(image)
         new_size = (int(pil_image.width * self.width_scale), int(pil_image.height * self.height_scale))
         stretched = pil_image.resize(new_size, Image.BICUBIC)
         out_img = np.array(stretched)
         return {
-            'image': out_img,
-            'preview': self.image_to_base64(out_img)
+            'image': out_img
         } 
\ No newline at end of file
@@ -1,6 +1,7 @@
 import numpy as np
 import cv2
 from .base import BaseNode
+from app.blur import gaussian_blur
 
 class UnsharpMaskingNode(BaseNode):
     def process(self, inputs):
@@ -8,7 +9,8 @@ class UnsharpMaskingNode(BaseNode):
         amount = float(self.params.get('amount', 1.0))
         if image is None:
             return {'image': None, 'metadata': {}}
-        blurred = cv2.GaussianBlur(image, (5, 5), 1.0)
+        ksize = self.scale_kernel_size(5, odd=True)
+        blurred = gaussian_blur(image, self.scale_length(1.0), ksize)
         sharpened = cv2.addWeighted(image, 1 + amount, blurred, -amount, 0)
         sharpened = np.clip(sharpened, 0, 255).astype(np.uint8)
         return {
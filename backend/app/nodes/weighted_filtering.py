@@ -13,6 +13,7 @@ class WeightedFilteringNode(BaseNode):
             kernel_size = 3
         if kernel_size % 2 == 0:
             kernel_size += 1
+        kernel_size = self.scale_kernel_size(kernel_size, odd=True)
         kernel = np.ones((kernel_size, kernel_size), dtype=np.float32)
         kernel /= kernel.sum()
         filtered = cv2.filter2D(image, -1, kernel)
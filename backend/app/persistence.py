@@ -0,0 +1,121 @@
+import json
+import os
+import tempfile
+import threading
+from app import custom_print
+
+DEFAULT_SAVE_DELAY_MS = 500
+# Mode of a newly created state file (an existing file keeps its own)
+DEFAULT_FILE_MODE = 0o644
+
+
+class StateWriter:
+    """Write-behind persistence of a JSON document.
+
+    schedule() serializes a snapshot of the state on the calling thread, which
+    is the thread that just changed it, so the timer thread never reads the live
+    graph. The first call in a quiet period starts a timer and only the latest
+    snapshot is written when it fires, so a burst of edits (a slider drag, a
+    graph load) costs one write, and a snapshot identical to the file's last
+    known content is not written at all. Writes go to a temporary file in the same
+    directory that is then renamed over the target, so readers never see a
+    partial file.
+    """
+
+    def __init__(self, path, get_state, delay_ms=None):
+        if delay_ms is None:
+            delay_ms = float(os.environ.get('GRAPH_SAVE_DELAY_MS', DEFAULT_SAVE_DELAY_MS))
+        self.path = path
+        self.get_state = get_state
+        self.delay = delay_ms / 1000.0
+        self.writes = 0
+        # Serialized state waiting to be written, or None
+        self._pending = None
+        # Serialized state the file is known to hold
+        self._saved = None
+        self._timer = None
+        self._lock = threading.Lock()
+        self._write_lock = threading.Lock()
+
+    def schedule(self):
+        """Note that the state changed; it is written after the coalescing delay"""
+        try:
+            snapshot = json.dumps(self.get_state())
+        except Exception as e:
+            # Like a failed write, a state that can't be serialized is reported, not raised into the edit
+            custom_print(f"Error saving graph state: {e}")
+            return
+        with self._lock:
+            if snapshot == self._saved:
+                # Changed back to what the file holds; nothing left to write
+                self._pending = None
+                return
+            self._pending = snapshot
+            if self.delay > 0:
+                if self._timer is None:
+                    self._timer = threading.Timer(self.delay, self._on_timer)
+                    self._timer.daemon = True
+                    self._timer.start()
+                return
+        # No delay configured: write synchronously
+        self.flush()
+
+    @property
+    def pending(self):
+        """Whether changes are waiting to be written"""
+        return self._pending is not None
+
+    def mark_saved(self):
+        """Note that the file holds the current state, e.g. right after it was loaded"""
+        snapshot = json.dumps(self.get_state())
+        with self._lock:
+            self._saved = snapshot
+            self._pending = None
+
+    def _on_timer(self):
+        with self._lock:
+            self._timer = None
+        self.flush()
+
+    def flush(self):
+        """Write pending changes now (e.g. on shutdown)"""
+        # Snapshots are taken and written under one lock, so concurrent flushes write them in order
+        with self._write_lock:
+            with self._lock:
+                if self._timer is not None:
+                    self._timer.cancel()
+                    self._timer = None
+                snapshot = self._pending
+                if snapshot is None:
+                    return
+                self._pending = None
+            try:
+                self._write(snapshot)
+                self.writes += 1
+                self._saved = snapshot
+            except Exception as e:
+                custom_print(f"Error saving graph state: {e}")
+                # Keep the changes pending so the next save retries them, unless newer ones arrived
+                with self._lock:
+                    if self._pending is None:
+                        self._pending = snapshot
+
+    def _write(self, snapshot):
+        directory = os.path.dirname(os.path.abspath(self.path))
+        fd, temp_path = tempfile.mkstemp(dir=directory, prefix='.graph_state.', suffix='.tmp')
+        try:
+            # mkstemp creates the file as 0600; keep the mode the state file had
+            try:
+                mode = os.stat(self.path).st_mode & 0o777
+            except FileNotFoundError:
+                mode = DEFAULT_FILE_MODE
+            os.fchmod(fd, mode)
+            with os.fdopen(fd, 'w') as f:
+                f.write(snapshot)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(temp_path, self.path)
+        except BaseException:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+            raise
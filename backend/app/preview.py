@@ -0,0 +1,186 @@
+import base64
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+import cv2
+import numpy as np
+from app import custom_print
+from .tracing import trace_span
+
+FORMATS = {
+    'png': ('.png', 'image/png'),
+    'jpeg': ('.jpg', 'image/jpeg'),
+    'webp': ('.webp', 'image/webp'),
+}
+
+_executor = None
+
+
+class PreviewOptions:
+    """How previews are encoded: codec, quality and the largest side they are downscaled to.
+
+    Defaults come from PREVIEW_FORMAT (png, jpeg or webp), PREVIEW_QUALITY (JPEG/WebP,
+    1-100), PREVIEW_PNG_COMPRESSION (0-9) and PREVIEW_MAX_SIDE (pixels, 0 disables
+    downscaling). Previews are for display only; /download always serves lossless
+    full-resolution PNG.
+    """
+
+    def __init__(self, format=None, quality=None, png_compression=None, max_side=None):
+        format = (format or os.environ.get('PREVIEW_FORMAT', 'png')).lower()
+        if format == 'jpg':
+            format = 'jpeg'
+        if format not in FORMATS:
+            raise ValueError(f"Unsupported preview format: {format}")
+        self.format = format
+        self.quality = int(quality if quality is not None else os.environ.get('PREVIEW_QUALITY', 85))
+        self.png_compression = int(png_compression if png_compression is not None
+                                   else os.environ.get('PREVIEW_PNG_COMPRESSION', 1))
+        self.max_side = int(max_side if max_side is not None else os.environ.get('PREVIEW_MAX_SIDE', 512))
+
+    @classmethod
+    def from_dict(cls, values):
+        """Options from request fields (format, quality, png_compression, max_side); missing fields use the defaults"""
+        values = values or {}
+        return cls(values.get('format'), values.get('quality'), values.get('png_compression'), values.get('max_side'))
+
+    @property
+    def mimetype(self):
+        return FORMATS[self.format][1]
+
+    @property
+    def token(self):
+        """Short string identifying these options, e.g. for ETags"""
+        level = self.png_compression if self.format == 'png' else self.quality
+        return f"{self.format}{level}-{self.max_side}"
+
+
+def to_uint8(image):
+    """Convert a node output to uint8 for display"""
+    # Array-like outputs such as spectra convert themselves
+    image = np.asarray(image)
+    if image.dtype == np.uint8:
+        return image
+    if np.iscomplexobj(image):
+        # Spectra are shown by their log magnitude, stretched over the full range
+        magnitude = np.log1p(np.abs(image))
+        return cv2.normalize(magnitude, None, 0, 255, cv2.NORM_MINMAX).astype(np.uint8)
+    if image.dtype in [np.float32, np.float64]:
+        return (image * 255).astype(np.uint8)
+    return image.astype(np.uint8)
+
+
+def downscale(image, max_side):
+    """Area-downsample so the longest side is at most max_side"""
+    height, width = image.shape[:2]
+    if not max_side or max(height, width) <= max_side:
+        return image
+    factor = max_side / max(height, width)
+    size = (max(1, int(round(width * factor))), max(1, int(round(height * factor))))
+    return cv2.resize(image, size, interpolation=cv2.INTER_AREA)
+
+
+def encode_image(image, options=None):
+    """Encode an image array for display; returns the encoded bytes"""
+    options = options or PreviewOptions()
+    image = downscale(to_uint8(image), options.max_side)
+    if image.ndim == 3 and image.shape[2] == 1:
+        image = image[:, :, 0]
+    # Node outputs are RGB(A); OpenCV encoders expect BGR(A)
+    if image.ndim == 3:
+        if image.shape[2] == 4 and options.format == 'jpeg':
+            image = cv2.cvtColor(image, cv2.COLOR_RGBA2BGR)
+        elif image.shape[2] == 4:
+            image = cv2.cvtColor(image, cv2.COLOR_RGBA2BGRA)
+        else:
+            image = cv2.cvtColor(image, cv2.COLOR_RGB2BGR)
+    if options.format == 'png':
+        params = [cv2.IMWRITE_PNG_COMPRESSION, options.png_compression]
+    elif options.format == 'jpeg':
+        params = [cv2.IMWRITE_JPEG_QUALITY, options.quality]
+    else:
+        params = [cv2.IMWRITE_WEBP_QUALITY, options.quality]
+    success, encoded = cv2.imencode(FORMATS[options.format][0], image, params)
+    if not success:
+        raise ValueError(f"Could not encode {options.format} preview")
+    return encoded.tobytes()
+
+
+def encode_data_url(image, options=None):
+    """Data URL for an image array, or None if it cannot be displayed"""
+    if image is None:
+        return None
+    options = options or PreviewOptions()
+    try:
+        encoded = base64.b64encode(encode_image(image, options)).decode('utf-8')
+        return f"data:{options.mimetype};base64,{encoded}"
+    except Exception as e:
+        custom_print(f"Error encoding preview, shape: {image.shape}, dtype: {image.dtype}: {e}")
+        return None
+
+
+def _get_executor():
+    global _executor
+    if _executor is None:
+        workers = int(os.environ.get('PREVIEW_WORKERS', min(4, os.cpu_count() or 1)))
+        _executor = ThreadPoolExecutor(max_workers=max(1, workers), thread_name_prefix='preview-encoder')
+    return _executor
+
+
+class PreviewEncoder:
+    """Encodes output buffers for one response, each distinct buffer at most once.
+
+    Nodes such as Output pass their input array through unchanged, so the same
+    buffer often appears under several nodes; it is keyed by identity. Buffers
+    requested together with encode_all are encoded in parallel (OpenCV releases
+    the GIL while encoding).
+    """
+
+    def __init__(self, options=None, tracer=None):
+        self.options = options or PreviewOptions()
+        self.tracer = tracer
+        # id(array) -> (array, data URL, encode ms); the array is held so its id cannot be reused
+        self._encoded = {}
+
+    def encode_all(self, images):
+        """Encode every distinct buffer in images that has not been encoded yet"""
+        pending = {}
+        for image in images:
+            if image is not None and id(image) not in self._encoded:
+                pending[id(image)] = image
+        if len(pending) > 1:
+            encoded = _get_executor().map(self._timed_encode, pending.values())
+        else:
+            encoded = [self._timed_encode(image) for image in pending.values()]
+        for (key, image), (url, encode_ms) in zip(pending.items(), encoded):
+            self._encoded[key] = (image, url, encode_ms)
+
+    def _timed_encode(self, image):
+        started = time.perf_counter()
+        with trace_span(self.tracer, 'encode_preview', 'preview', shape=list(image.shape), format=self.options.format):
+            url = encode_data_url(image, self.options)
+        return url, (time.perf_counter() - started) * 1000
+
+    def encode(self, image):
+        if image is None:
+            return None
+        if id(image) not in self._encoded:
+            self.encode_all([image])
+        return self._encoded[id(image)][1]
+
+    def encode_ms(self, image):
+        """Milliseconds spent encoding a buffer, or 0.0 if it was not encoded"""
+        entry = self._encoded.get(id(image)) if image is not None else None
+        return entry[2] if entry else 0.0
+
+
+def normalize_preview_nodes(preview_nodes, node_ids):
+    """Map node id -> sockets to encode.
+
+    preview_nodes may be None (the 'image' socket of every node), a list of node
+    ids (their 'image' socket) or a dict of node id -> list of socket names.
+    """
+    if preview_nodes is None:
+        return {node_id: ('image',) for node_id in node_ids}
+    if isinstance(preview_nodes, dict):
+        return {node_id: tuple(sockets or ('image',)) for node_id, sockets in preview_nodes.items()}
+    return {node_id: ('image',) for node_id in preview_nodes}
@@ -0,0 +1,57 @@
+import os
+import threading
+
+# Longest-side sizes the adaptive policy chooses between; None means full resolution
+PROXY_LEVELS = (256, 512, 1024, 2048, 4096, None)
+
+
+class ProxyPolicy:
+    """Chooses the resolution interactive executions run at.
+
+    With a fixed max_side, inputs are downscaled so their longest side fits it.
+    With a latency budget, the level is picked from the measured cost of previous
+    executions: the largest level whose predicted full re-run fits the budget.
+    """
+
+    def __init__(self, max_side=None, latency_budget_ms=None):
+        if max_side is None:
+            max_side = int(os.environ.get('PROXY_MAX_SIDE', 1024))
+        if latency_budget_ms is None and os.environ.get('PROXY_LATENCY_BUDGET_MS'):
+            latency_budget_ms = float(os.environ['PROXY_LATENCY_BUDGET_MS'])
+        self.max_side = max_side
+        self.latency_budget_ms = latency_budget_ms
+        # Smoothed seconds per megapixel per executed node
+        self.seconds_per_mpix_node = None
+        self._lock = threading.Lock()
+
+    def choose_scale(self, longest_side, shortest_side, node_count, latency_budget_ms=None):
+        """Scale factor (<= 1) for inputs whose largest frame is longest_side x shortest_side"""
+        if not longest_side:
+            return 1.0
+        budget = latency_budget_ms if latency_budget_ms is not None else self.latency_budget_ms
+        if budget is None or self.seconds_per_mpix_node is None:
+            if not self.max_side or longest_side <= self.max_side:
+                return 1.0
+            return self.max_side / longest_side
+
+        full_mpix = longest_side * shortest_side / 1e6
+        chosen = PROXY_LEVELS[0]
+        for level in PROXY_LEVELS:
+            scale = 1.0 if level is None else min(1.0, level / longest_side)
+            predicted_ms = 1000 * self.seconds_per_mpix_node * full_mpix * scale * scale * max(1, node_count)
+            if predicted_ms <= budget:
+                chosen = level
+            if scale == 1.0:
+                break
+        return 1.0 if chosen is None else min(1.0, chosen / longest_side)
+
+    def record(self, seconds, mpix, nodes_run):
+        """Feed back the cost of an execution that ran nodes_run nodes on mpix-sized inputs"""
+        if nodes_run <= 0 or mpix <= 0:
+            return
+        rate = seconds / (mpix * nodes_run)
+        with self._lock:
+            if self.seconds_per_mpix_node is None:
+                self.seconds_per_mpix_node = rate
+            else:
+                self.seconds_per_mpix_node = 0.7 * self.seconds_per_mpix_node + 0.3 * rate
@@ -0,0 +1,143 @@
+import hashlib
+import json
+import os
+import threading
+import uuid
+from collections import OrderedDict
+import numpy as np
+
+DEFAULT_MAX_BYTES = 512 * 1024 * 1024  # 512MB per process
+# Marks keys and hashes of results that must not be reused, and of everything derived from them
+VOLATILE_PREFIX = 'volatile-'
+
+
+def default_cache_max_bytes():
+    """Result cache budget of a process: RESULT_CACHE_MAX_MB (default 512) megabytes"""
+    return int(float(os.environ.get('RESULT_CACHE_MAX_MB', 512)) * 1024 * 1024)
+
+
+def _json_default(value):
+    """Make params such as numpy kernels hashable through json"""
+    if isinstance(value, np.ndarray):
+        return value.tolist()
+    if isinstance(value, np.generic):
+        return value.item()
+    return str(value)
+
+
+def hash_params(params):
+    """Canonical hash of a node's params, independent of key order"""
+    encoded = json.dumps(params or {}, sort_keys=True, default=_json_default)
+    return hashlib.blake2b(encoded.encode('utf-8'), digest_size=16).hexdigest()
+
+
+def hash_bytes(data):
+    """Content hash of raw bytes, e.g. an uploaded image file"""
+    return hashlib.blake2b(data, digest_size=16).hexdigest()
+
+
+def make_key(node_type, params, state_token, input_hashes):
+    """Build the cache key for a node from its type, params, own state and input content hashes"""
+    parts = [node_type, hash_params(params), str(state_token)]
+    for socket_name, content_hash in sorted(input_hashes.items()):
+        parts.append(f"{socket_name}={content_hash}")
+    return hashlib.blake2b('|'.join(parts).encode('utf-8'), digest_size=16).hexdigest()
+
+
+def volatile_key():
+    """Unique key for a result that is not cached (e.g. random noise)"""
+    return VOLATILE_PREFIX + uuid.uuid4().hex
+
+
+def is_volatile(content_hash):
+    return content_hash is not None and content_hash.startswith(VOLATILE_PREFIX)
+
+
+def output_hash(key, socket_name):
+    """Content hash of one output socket, derived from the producing node's key (volatile if the key is)"""
+    digest = hashlib.blake2b(f"{key}:{socket_name}".encode('utf-8'), digest_size=16).hexdigest()
+    return VOLATILE_PREFIX + digest if is_volatile(key) else digest
+
+
+def result_nbytes(value):
+    """Approximate memory held by a node result"""
+    if isinstance(value, np.ndarray):
+        return value.nbytes
+    if isinstance(value, dict):
+        return sum(result_nbytes(v) for v in value.values())
+    if isinstance(value, (list, tuple)):
+        return sum(result_nbytes(v) for v in value)
+    if isinstance(value, (str, bytes)):
+        return len(value)
+    # Array-like results such as spectra report their own size
+    return getattr(value, 'nbytes', 0)
+
+
+class ResultCache:
+    """LRU cache of node results bounded by the total bytes of the arrays they hold"""
+
+    def __init__(self, max_bytes=DEFAULT_MAX_BYTES):
+        self.max_bytes = max_bytes
+        self.current_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.evicted_bytes = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        """Return the cached result for key, or None"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def put(self, key, result):
+        """Store a result, evicting least recently used entries to stay within budget"""
+        nbytes = result_nbytes(result)
+        with self._lock:
+            if nbytes > self.max_bytes:
+                return
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self.current_bytes -= previous[1]
+            self._entries[key] = (result, nbytes)
+            self.current_bytes += nbytes
+            self._evict()
+
+    def set_max_bytes(self, max_bytes):
+        """Change the memory ceiling, evicting immediately if needed"""
+        with self._lock:
+            self.max_bytes = max_bytes
+            self._evict()
+
+    def _evict(self):
+        """Drop least recently used entries until under budget; caller holds the lock"""
+        while self.current_bytes > self.max_bytes and self._entries:
+            _, (_, evicted) = self._entries.popitem(last=False)
+            self.current_bytes -= evicted
+            self.evictions += 1
+            self.evicted_bytes += evicted
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.current_bytes = 0
+
+    def stats(self):
+        """Counters for monitoring and sizing the cache"""
+        with self._lock:
+            return {
+                'entries': len(self._entries),
+                'current_bytes': self.current_bytes,
+                'max_bytes': self.max_bytes,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'evicted_bytes': self.evicted_bytes,
+            }
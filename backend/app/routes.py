@@ -1,62 +1,135 @@
-from flask import Blueprint, request, jsonify, send_file
+from flask import Blueprint, request, jsonify, send_file, Response, g
+from werkzeug.local import LocalProxy
 import os
 import io
+import logging
+import time
+from urllib.parse import quote
 import base64
 from werkzeug.utils import secure_filename
-from .graph_engine import GraphEngine
+from .sessions import SessionRegistry, DEFAULT_SESSION, valid_session_id
+from .preview import PreviewEncoder, PreviewOptions, normalize_preview_nodes, encode_image
+from .result_cache import ResultCache
+from .spectral import Spectrum, spectral_cache
+from .tracing import Tracer, trace_span
 from PIL import Image
 import numpy as np
 import json
 import traceback
-from app import custom_print
+from app import custom_print, logger
 
 main = Blueprint('main', __name__)
 
-# Global graph engine instance
-graph_engine = GraphEngine()
+# Graph engines per session, shared across worker processes through the session store
+sessions = SessionRegistry()
 
-def serialize_results(results):
-    """Serialize graph execution results to JSON-safe format"""
+def get_session_id():
+    """Session a request belongs to: X-Session-ID header or session_id parameter"""
+    session_id = request.headers.get('X-Session-ID') or request.values.get('session_id')
+    if session_id is None and request.is_json:
+        session_id = (request.get_json(silent=True) or {}).get('session_id')
+    return session_id or DEFAULT_SESSION
+
+def get_graph_engine():
+    """The request's session engine, locked and synced with the store on first use"""
+    if 'graph_engine' not in g:
+        g.session_context = sessions.session(get_session_id())
+        g.graph_engine = g.session_context.__enter__()
+    return g.graph_engine
+
+# Engine of the current request's session
+graph_engine = LocalProxy(get_graph_engine)
+
+@main.before_request
+def check_session_id():
+    if not valid_session_id(get_session_id()):
+        return jsonify({'error': 'Invalid session id'}), 400
+
+@main.teardown_request
+def release_session(exc):
+    """Write the session's changes back to the store and release its lock"""
+    session_context = g.pop('session_context', None)
+    if session_context is not None:
+        g.pop('graph_engine', None)
+        session_context.__exit__(None, None, None)
+
+# Encoded images served by /result, keyed by ETag
+encoded_cache = ResultCache(int(float(os.environ.get('ENCODED_CACHE_MAX_MB', 64)) * 1024 * 1024))
+
+# Socket values that are described and previewed as images
+ARRAY_OUTPUTS = (np.ndarray, Spectrum)
+
+def serialize_value(value, encoder):
+    """Serialize a non-socket value (e.g. metadata) to a JSON-safe format"""
+    if isinstance(value, np.ndarray):
+        return encoder.encode(value)
+    if isinstance(value, dict):
+        # Recursively serialize nested dictionaries
+        return {key: serialize_value(item, encoder) for key, item in value.items()}
+    try:
+        # Test if it's JSON serializable
+        json.dumps(value)
+        return value
+    except (TypeError, ValueError):
+        # If not serializable, convert to string
+        return str(value)
+
+def describe_output(node_id, socket, value, content_hash):
+    """Lightweight descriptor of an array output; the encoded image is fetched from its url"""
+    return {
+        'shape': list(value.shape),
+        'dtype': str(value.dtype),
+        'hash': content_hash,
+        # The hash in the query makes the url change whenever the content does
+        'url': f"/result/{quote(node_id, safe='')}/{quote(socket, safe='')}?v={content_hash}"
+    }
+
+def serialize_results(results, preview_nodes=None, hashes=None, inline=True, options=None, timings=None, tracer=None):
+    """Serialize graph execution results to JSON-safe format.
+
+    Every array output is described under 'outputs' (see describe_output) when its
+    content hash is known. With inline=True, arrays are also encoded as data URLs
+    (see PreviewOptions) for the nodes and sockets in preview_nodes (see
+    normalize_preview_nodes; default: the 'image' socket of every node), each
+    distinct buffer once and in parallel. A node's 'image' socket is returned as
+    'preview'; other requested sockets under their own name. Unrequested arrays
+    are omitted. If timings (node id -> stats) is given, each node's encode time
+    is added to it as 'encode_ms'; a shared buffer counts for the first node.
+    """
+    with trace_span(tracer, 'serialize_results', 'serialize'):
+        return _serialize_results(results, preview_nodes, hashes, inline, options, timings, tracer)
+
+def _serialize_results(results, preview_nodes, hashes, inline, options, timings, tracer):
+    requested = normalize_preview_nodes(preview_nodes, results.keys()) if inline else {}
+    hashes = hashes or {}
+    encoder = PreviewEncoder(options, tracer)
+    encoder.encode_all([value for node_id, node_result in results.items()
+                        for key, value in node_result.items()
+                        if key in requested.get(node_id, ()) and isinstance(value, ARRAY_OUTPUTS)])
     serialized = {}
+    charged = set()
     for node_id, node_result in results.items():
+        sockets = requested.get(node_id, ())
+        if timings is not None:
+            buffers = [value for key, value in node_result.items()
+                       if key in sockets and isinstance(value, ARRAY_OUTPUTS) and id(value) not in charged]
+            charged.update(id(value) for value in buffers)
+            timings.setdefault(node_id, {})['encode_ms'] = sum(encoder.encode_ms(value) for value in buffers)
+        node_hashes = hashes.get(node_id, {})
+        outputs = {}
         serialized[node_id] = {}
         for key, value in node_result.items():
-            if isinstance(value, np.ndarray):
-                # Convert numpy array to base64
-                try:
-                    # Ensure it's uint8 for image data
-                    if value.dtype != np.uint8:
-                        if value.dtype in [np.float32, np.float64]:
-                            value = (value * 255).astype(np.uint8)
-                        else:
-                            value = value.astype(np.uint8)
-                    
-                    # Convert to PIL Image and then to base64
-                    if len(value.shape) == 3:
-                        pil_image = Image.fromarray(value)
-                    else:
-                        pil_image = Image.fromarray(value, mode='L')
-                    
-                    buffer = io.BytesIO()
-                    pil_image.save(buffer, format='PNG')
-                    buffer.seek(0)
-                    base64_str = base64.b64encode(buffer.getvalue()).decode('utf-8')
-                    serialized[node_id][key] = f"data:image/png;base64,{base64_str}"
-                except Exception as e:
-                    custom_print(f"Error serializing numpy array for {node_id}.{key}: {e}")
-                    serialized[node_id][key] = None
-            elif isinstance(value, dict):
-                # Recursively serialize nested dictionaries
-                serialized[node_id][key] = serialize_results({key: value})[key]
-            else:
-                # For other types, try to serialize directly
-                try:
-                    # Test if it's JSON serializable
-                    json.dumps(value)
-                    serialized[node_id][key] = value
-                except (TypeError, ValueError):
-                    # If not serializable, convert to string
-                    serialized[node_id][key] = str(value)
+            if isinstance(value, ARRAY_OUTPUTS):
+                if node_hashes.get(key):
+                    outputs[key] = describe_output(node_id, key, value, node_hashes[key])
+                if key in sockets and key != 'image':
+                    serialized[node_id][key] = encoder.encode(value)
+            elif key != 'image':
+                serialized[node_id][key] = serialize_value(value, encoder)
+        if outputs:
+            serialized[node_id]['outputs'] = outputs
+        if 'image' in sockets:
+            serialized[node_id]['preview'] = encoder.encode(node_result.get('image'))
     return serialized
 
 @main.route('/upload', methods=['POST'])
@@ -96,14 +169,15 @@ def upload_image():
         
         # Set image in the node
         if hasattr(node_instance, 'set_image'):
-            success = node_instance.set_image(file)
+            # Uploads only need the proxy resolution until a full-resolution render
+            success = graph_engine.set_image(node_id, file, max_side=graph_engine.proxy_policy.max_side)
             if success:
                 custom_print(f"Image uploaded successfully to {node_id}")
-                # Execute graph to get updated results
-                results = graph_engine.execute_graph()
+                # Only the input node's metadata is returned; /process renders the previews
+                results = graph_engine.execute_graph(targets=[node_id], proxy=True)
                 return jsonify({
                     'success': True,
-                    'results': serialize_results(results),
+                    'results': serialize_results(results, preview_nodes=[]),
                     'message': 'Image uploaded successfully'
                 })
             else:
@@ -112,52 +186,79 @@ def upload_image():
             return jsonify({'error': 'Node does not support image input'}), 400
             
     except Exception as e:
-        custom_print(f"Error in upload: {e}")
+        custom_print(f"Error in upload: {e}", level=logging.ERROR)
         import traceback
         traceback.print_exc()
         return jsonify({'error': str(e)}), 500
 
 @main.route('/process', methods=['POST'])
 def process_graph():
-    """Process the entire graph and return results"""
+    """Process the entire graph and return results.
+    
+    With trace: true (or ?trace=1) the response is instead a Chrome trace-event
+    JSON of the request (see app.tracing), for chrome://tracing or Perfetto.
+    """
     try:
         data = request.get_json() or {}
-        custom_print(f"Processing graph with data: {data}")
-        
-        # Update node parameters if provided
-        if 'node_updates' in data:
-            for node_id, params in data['node_updates'].items():
-                custom_print(f"Updating node {node_id} with params: {params}")
-                graph_engine.update_node_params(node_id, params)
-        
-        # Add connections if provided
-        if 'connections' in data:
-            graph_engine.set_connections(data['connections'])
-        
-        # Execute graph
-        custom_print("Executing graph...")
-        results = graph_engine.execute_graph()
-        custom_print(f"Graph execution results: {list(results.keys())}")
+        logger.debug("Processing graph with data: %s", data)
+        tracer = Tracer() if data.get('trace') or request.args.get('trace') in ('1', 'true') else None
+        
+        # Apply parameter and connection updates, persisting them once
+        with trace_span(tracer, 'apply_updates'), graph_engine.bulk_update():
+            if 'node_updates' in data:
+                for node_id, params in data['node_updates'].items():
+                    graph_engine.update_node_params(node_id, params)
+            
+            if 'connections' in data:
+                graph_engine.set_connections(data['connections'])
         
-        # Check if output node has results
+        # Output nodes are always rendered; when the client names the nodes it
+        # shows previews for, only the subgraph feeding those is executed
         output_nodes = [node_id for node_id, node_data in graph_engine.nodes.items() 
                        if node_data['type'] == 'Output']
-        custom_print(f"Output nodes: {output_nodes}")
-        
-        for output_node in output_nodes:
-            if output_node in results:
-                output_result = results[output_node]
-                custom_print(f"Output node {output_node} result: {list(output_result.keys())}")
-                if 'preview' in output_result:
-                    custom_print(f"Output node {output_node} has preview: {output_result['preview'][:100] if output_result['preview'] else 'None'}...")
-        
-        return jsonify({
+        logger.debug("Output nodes: %s", output_nodes)
+        preview_nodes = data.get('preview_nodes')
+        if preview_nodes is not None:
+            preview_nodes = normalize_preview_nodes(preview_nodes, [])
+            for node_id in output_nodes:
+                preview_nodes.setdefault(node_id, ('image',))
+        targets = data.get('targets')
+        if targets is None and preview_nodes is not None:
+            targets = list(preview_nodes)
+        
+        # Execute graph, optionally only the part feeding the requested targets
+        # Interactive edits run on downscaled proxies unless a full-resolution render is requested
+        results = graph_engine.execute_graph(targets=targets,
+                                             proxy=not data.get('render', False),
+                                             latency_budget_ms=data.get('latency_budget_ms'),
+                                             tracer=tracer)
+        logger.debug("Graph execution results: %s", list(results))
+        
+        # With timings requested, per-node statistics of this execution are returned too
+        timings = None
+        if data.get('timings') or request.args.get('timings') in ('1', 'true'):
+            timings = dict(graph_engine.last_timings)
+            timings['nodes'] = {node_id: dict(stats) for node_id, stats in timings.get('nodes', {}).items()}
+        serialize_started = time.perf_counter()
+        response = {
             'success': True,
-            'results': serialize_results(results)
-        })
+            'results': serialize_results(results, preview_nodes, graph_engine.result_hashes,
+                                         inline=data.get('transport', 'inline') != 'binary',
+                                         options=PreviewOptions.from_dict(data.get('preview')),
+                                         timings=timings['nodes'] if timings is not None else None,
+                                         tracer=tracer)
+        }
+        if timings is not None:
+            timings['serialize_ms'] = (time.perf_counter() - serialize_started) * 1000
+            response['timings'] = timings
+        with trace_span(tracer, 'build_json', 'serialize'):
+            response = jsonify(response)
+        if tracer is not None:
+            return jsonify(tracer.to_dict())
+        return response
         
     except Exception as e:
-        custom_print(f"Error in process: {e}")
+        custom_print(f"Error in process: {e}", level=logging.ERROR)
         import traceback
         traceback.print_exc()
         return jsonify({'error': str(e)}), 500
@@ -328,8 +429,8 @@ def download_image():
         if not node_id:
             return jsonify({'error': 'Missing node_id'}), 400
         
-        # Execute graph to get latest results
-        results = graph_engine.execute_graph()
+        # Execute only the subgraph feeding the requested node, at full resolution
+        results = graph_engine.execute_graph(targets=[node_id], proxy=False)
         
         if node_id not in results:
             return jsonify({'error': 'Node not found in results'}), 404
@@ -363,6 +464,57 @@ def download_image():
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+@main.route('/result/<node_id>/<socket>', methods=['GET'])
+def get_result(node_id, socket):
+    """Serve one node output as a preview image; unchanged outputs are answered with 304 Not Modified"""
+    try:
+        # Encoding options come from the query (format, quality, png_compression, max_side)
+        try:
+            options = PreviewOptions.from_dict(request.args)
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+        
+        started = time.perf_counter()
+        value, content_hash = graph_engine.get_output(node_id, socket,
+                                                      proxy=request.args.get('render') not in ('1', 'true'))
+        if not isinstance(value, ARRAY_OUTPUTS) or content_hash is None:
+            return jsonify({'error': 'Result not found'}), 404
+        # Server-Timing shows the time spent computing and encoding in the browser's network panel
+        server_timing = [f"execute;dur={(time.perf_counter() - started) * 1000:.1f}"]
+        
+        etag = f"{content_hash}.{options.token}"
+        if request.if_none_match.contains(etag):
+            response = Response(status=304)
+        else:
+            data = encoded_cache.get(etag)
+            if data is None:
+                started = time.perf_counter()
+                data = encode_image(value, options)
+                encoded_cache.put(etag, data)
+                server_timing.append(f"encode;dur={(time.perf_counter() - started) * 1000:.1f}")
+            response = Response(data, mimetype=options.mimetype)
+        response.set_etag(etag)
+        response.headers['Server-Timing'] = ', '.join(server_timing)
+        # Always revalidate; the ETag makes that a bodyless 304 while the output is unchanged
+        response.headers['Cache-Control'] = 'no-cache'
+        return response
+        
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@main.route('/cache_stats', methods=['GET'])
+def cache_stats():
+    """Result, encoded-image and frequency-grid cache counters"""
+    try:
+        return jsonify({
+            'success': True,
+            'cache': graph_engine.result_cache.stats(),
+            'encoded': encoded_cache.stats(),
+            'spectral': spectral_cache.stats()
+        })
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
 @main.route('/health', methods=['GET'])
 def health_check():
     """Health check endpoint"""
@@ -0,0 +1,81 @@
+import heapq
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+
+
+def default_worker_count():
+    """Worker threads for graph execution, overridable with GRAPH_WORKERS"""
+    configured = os.environ.get('GRAPH_WORKERS')
+    if configured:
+        return max(1, int(configured))
+    return min(8, os.cpu_count() or 1)
+
+
+class GraphScheduler:
+    """Runs graph nodes on a bounded thread pool as soon as all of their inputs are resolved.
+
+    OpenCV, scipy.ndimage and NumPy release the GIL for most of their work, so
+    independent branches of a fan-out graph execute concurrently.
+    """
+
+    def __init__(self, max_workers=None):
+        self.max_workers = max_workers or default_worker_count()
+        self._executor = None
+        self._lock = threading.Lock()
+
+    def _get_executor(self):
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=self.max_workers,
+                                                    thread_name_prefix='graph-worker')
+            return self._executor
+
+    def run(self, order, dependencies, run_node, on_done):
+        """Execute every node in order.
+
+        order: node ids in topological order
+        dependencies: node id -> set of node ids in order that must finish first
+        run_node: called on a worker thread with a node id, returns its result
+        on_done: called on the calling thread with (node id, result) as nodes finish
+        """
+        if self.max_workers == 1 or len(order) <= 1:
+            for node_id in order:
+                on_done(node_id, run_node(node_id))
+            return
+
+        position = {node_id: index for index, node_id in enumerate(order)}
+        remaining = {node_id: len(dependencies.get(node_id, ())) for node_id in order}
+        dependents = {node_id: [] for node_id in order}
+        for node_id in order:
+            for dependency in dependencies.get(node_id, ()):
+                dependents[dependency].append(node_id)
+
+        # Ready nodes are dispatched in topological order so runs are reproducible
+        ready = [position[node_id] for node_id in order if remaining[node_id] == 0]
+        heapq.heapify(ready)
+        executor = self._get_executor()
+        running = {}
+        try:
+            while ready or running:
+                while ready and len(running) < self.max_workers:
+                    node_id = order[heapq.heappop(ready)]
+                    running[executor.submit(run_node, node_id)] = node_id
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in sorted(done, key=lambda f: position[running[f]]):
+                    node_id = running.pop(future)
+                    on_done(node_id, future.result())
+                    for dependent in dependents[node_id]:
+                        remaining[dependent] -= 1
+                        if remaining[dependent] == 0:
+                            heapq.heappush(ready, position[dependent])
+        finally:
+            # Let in-flight nodes finish before the caller touches shared state again
+            if running:
+                wait(running)
+
+    def shutdown(self):
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=True)
+                self._executor = None
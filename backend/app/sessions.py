@@ -0,0 +1,282 @@
+import fcntl
+import json
+import os
+import re
+import shutil
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+import numpy as np
+from app import custom_print
+from .image_store import ImageStore
+from .persistence import DEFAULT_FILE_MODE
+from .result_cache import ResultCache, default_cache_max_bytes
+from .scheduler import GraphScheduler
+
+DEFAULT_SESSION = 'default'
+SESSION_ID_PATTERN = re.compile(r'^[A-Za-z0-9_-]{1,64}$')
+
+# How often a process sweeps the store for expired sessions
+SWEEP_INTERVAL_SECONDS = 300
+
+
+def valid_session_id(session_id):
+    return bool(session_id) and SESSION_ID_PATTERN.match(session_id) is not None
+
+
+def stored_image_id(content_hash, encoded):
+    """Image store id of an input image, kept as pixels or as the encoded file"""
+    return f"{content_hash}-encoded" if encoded else content_hash
+
+
+def _write_atomic(path, write):
+    """Write a file through a temporary file in the same directory and rename it into place"""
+    fd, temp_path = tempfile.mkstemp(dir=os.path.dirname(path), prefix='.tmp.')
+    try:
+        # mkstemp creates the file as 0600; keep the mode the file had
+        try:
+            mode = os.stat(path).st_mode & 0o777
+        except FileNotFoundError:
+            mode = DEFAULT_FILE_MODE
+        os.fchmod(fd, mode)
+        with os.fdopen(fd, 'wb') as f:
+            write(f)
+        os.replace(temp_path, path)
+    except BaseException:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        raise
+
+
+class SessionStore:
+    """Per-session graph state in a directory shared by all worker processes.
+
+    Each session directory holds graph_state.json and inputs.json, which records
+    the decoded image each Image Input node holds. The pixels themselves live in
+    the shared ImageStore, referenced as '<session>/<node>', so every worker maps
+    the same memory instead of decoding or copying. Sessions untouched for
+    SESSION_TTL_SECONDS (default one day) are deleted with their references.
+    """
+
+    def __init__(self, root=None, ttl_seconds=None, image_store=None):
+        self.root = root or os.environ.get('SESSION_STORE_DIR') or os.path.join(os.path.dirname(__file__), 'sessions')
+        if ttl_seconds is None:
+            ttl_seconds = float(os.environ.get('SESSION_TTL_SECONDS', 24 * 3600))
+        self.ttl_seconds = ttl_seconds
+        self.image_store = image_store or ImageStore()
+        self._last_sweep = 0.0
+        os.makedirs(self.root, exist_ok=True)
+
+    def session_dir(self, session_id):
+        if not valid_session_id(session_id):
+            raise ValueError(f"Invalid session id: {session_id!r}")
+        path = os.path.join(self.root, session_id)
+        os.makedirs(path, exist_ok=True)
+        return path
+
+    def state_file(self, session_id):
+        return os.path.join(self.session_dir(session_id), 'graph_state.json')
+
+    @contextmanager
+    def lock(self, session_id):
+        """Exclusive access to a session across threads and processes"""
+        lock_path = os.path.join(self.session_dir(session_id), '.lock')
+        with open(lock_path, 'a') as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                # The lock file's mtime records when the session was last used
+                os.utime(lock_path)
+                yield
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def signature(self, session_id):
+        """Changes whenever another process rewrites the session's state or inputs"""
+        directory = self.session_dir(session_id)
+        signature = []
+        for name in ('graph_state.json', 'inputs.json'):
+            try:
+                st = os.stat(os.path.join(directory, name))
+                signature.append((st.st_ino, st.st_mtime_ns, st.st_size))
+            except FileNotFoundError:
+                signature.append(None)
+        return tuple(signature)
+
+    def load_inputs(self, session_id):
+        """node id -> {'hash', 'metadata'} for the session's loaded input images"""
+        path = os.path.join(self.session_dir(session_id), 'inputs.json')
+        if not os.path.exists(path):
+            return {}
+        with open(path, 'r') as f:
+            return json.load(f)
+
+    def load_image(self, image_id):
+        """Zero-copy (copy-on-write) view of a stored input image"""
+        return self.image_store.get(image_id, writable=True)
+
+    def save_inputs(self, session_id, inputs):
+        """Store input images; inputs maps node id -> (image, content hash, metadata, encoded).
+
+        encoded marks images held as the bytes of the encoded file rather than pixels.
+        """
+        previous = self.load_inputs(session_id)
+        index = {}
+        for node_id, (image, content_hash, metadata, encoded) in inputs.items():
+            self.image_store.put(image, f"{session_id}/{node_id}", image_id=stored_image_id(content_hash, encoded))
+            index[node_id] = {'hash': content_hash, 'metadata': metadata, 'encoded': encoded}
+        _write_atomic(os.path.join(self.session_dir(session_id), 'inputs.json'),
+                      lambda f: f.write(json.dumps(index, default=str).encode('utf-8')))
+        # Release images the session's nodes no longer hold
+        for node_id, entry in previous.items():
+            old_id = stored_image_id(entry['hash'], entry.get('encoded', False))
+            if node_id not in index or stored_image_id(index[node_id]['hash'], index[node_id]['encoded']) != old_id:
+                self.image_store.release(old_id, f"{session_id}/{node_id}")
+
+    def sweep(self):
+        """Delete sessions idle for longer than the TTL; runs at most every SWEEP_INTERVAL_SECONDS"""
+        now = time.time()
+        if not self.ttl_seconds or now - self._last_sweep < SWEEP_INTERVAL_SECONDS:
+            return
+        self._last_sweep = now
+        for session_id in os.listdir(self.root):
+            lock_path = os.path.join(self.root, session_id, '.lock')
+            try:
+                if now - os.stat(lock_path).st_mtime < self.ttl_seconds:
+                    continue
+                with open(lock_path, 'a') as lock_file:
+                    # Skip sessions that are in use right now
+                    fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                    shutil.rmtree(os.path.join(self.root, session_id))
+                    self.image_store.release_holder_prefix(f"{session_id}/")
+                custom_print(f"Expired session {session_id}")
+            except (OSError, BlockingIOError):
+                continue
+        self.image_store.sweep()
+
+
+class SessionEntry:
+    def __init__(self, engine):
+        self.engine = engine
+        self.signature = None
+        self.saved_inputs = {}
+        self.last_used = time.time()
+
+
+class SessionRegistry:
+    """Graph engines keyed by session id, kept consistent across worker processes.
+
+    Every request runs inside session(): it takes the session's cross-process
+    lock, reloads the graph state and input images if another worker changed
+    them, and afterwards writes back whatever this request changed. All engines
+    of the process share one result cache and one scheduler thread pool, so
+    RESULT_CACHE_MAX_MB and GRAPH_WORKERS bound the process, not each session.
+    Engines idle for SESSION_IDLE_SECONDS (default 600) are dropped from the
+    process; their state stays in the store.
+    """
+
+    def __init__(self, store=None, idle_seconds=None, engine_factory=None):
+        self.store = store or SessionStore()
+        if idle_seconds is None:
+            idle_seconds = float(os.environ.get('SESSION_IDLE_SECONDS', 600))
+        self.idle_seconds = idle_seconds
+        self.result_cache = ResultCache(default_cache_max_bytes())
+        self.scheduler = GraphScheduler()
+        if engine_factory is None:
+            from .graph_engine import GraphEngine
+            engine_factory = lambda state_file: GraphEngine(state_file=state_file, result_cache=self.result_cache,
+                                                            scheduler=self.scheduler)
+        self.engine_factory = engine_factory
+        self._entries = {}
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def session(self, session_id):
+        with self.store.lock(session_id):
+            entry = self._sync(session_id)
+            try:
+                yield entry.engine
+            finally:
+                self._commit(session_id, entry)
+        self._evict_idle()
+        self.store.sweep()
+
+    def _sync(self, session_id):
+        """Get this process's engine for a session, up to date with the shared store"""
+        with self._lock:
+            entry = self._entries.get(session_id)
+        if entry is None:
+            # A new engine loads the stored graph state itself
+            entry = SessionEntry(self.engine_factory(self.store.state_file(session_id)))
+            with self._lock:
+                self._entries[session_id] = entry
+        else:
+            entry.last_used = time.time()
+
+        signature = self.store.signature(session_id)
+        if signature == entry.signature:
+            return entry
+        engine = entry.engine
+        if entry.signature is not None and signature[0] != entry.signature[0]:
+            custom_print(f"Session {session_id} changed in another worker, reloading")
+            # Only the nodes the other worker changed (and their descendants) lose their results
+            engine.load_graph_state_from_disk(incremental=True)
+            entry.saved_inputs = {}
+
+        for node_id, stored in self.store.load_inputs(session_id).items():
+            node_instance = engine.node_instances.get(node_id)
+            if node_instance is None or not hasattr(node_instance, 'set_decoded'):
+                continue
+            encoded = stored.get('encoded', False)
+            # Adopt the stored image if it is new, or fully decoded where this process only has a draft
+            if node_instance.content_hash != stored['hash'] or (node_instance.image_data is None and not encoded):
+                try:
+                    image = self.store.load_image(stored_image_id(stored['hash'], encoded))
+                except KeyError:
+                    custom_print(f"Input image for {session_id}/{node_id} is no longer stored")
+                    continue
+                if encoded:
+                    node_instance.set_encoded(image.tobytes(), engine.proxy_policy.max_side)
+                else:
+                    node_instance.set_decoded(image, stored['hash'], stored['metadata'])
+                engine.mark_dirty(node_id)
+            entry.saved_inputs[node_id] = (stored['hash'], encoded)
+        entry.signature = signature
+        return entry
+
+    def _commit(self, session_id, entry):
+        """Write the request's changes to the shared store"""
+        engine = entry.engine
+        try:
+            # Other workers must see this request's graph changes once the lock is released;
+            # requests that changed nothing (e.g. reprocessing the same graph) write nothing
+            if engine.state_writer.pending:
+                engine.flush_graph_state()
+            inputs = {}
+            for node_id, node_instance in engine.node_instances.items():
+                if getattr(node_instance, 'content_hash', None) is None:
+                    continue
+                if node_instance.image_data is None:
+                    # Full decode still deferred: share the encoded file so other workers can draft-decode it
+                    image = np.frombuffer(node_instance.encoded_data, dtype=np.uint8)
+                    inputs[node_id] = (image, node_instance.content_hash, node_instance.metadata, True)
+                else:
+                    inputs[node_id] = (node_instance.image_data, node_instance.content_hash, node_instance.metadata, False)
+            saved = {node_id: (value[1], value[3]) for node_id, value in inputs.items()}
+            if saved != entry.saved_inputs:
+                self.store.save_inputs(session_id, inputs)
+                entry.saved_inputs = saved
+        finally:
+            entry.signature = self.store.signature(session_id)
+            entry.last_used = time.time()
+
+    def _evict_idle(self):
+        now = time.time()
+        with self._lock:
+            idle = [session_id for session_id, entry in self._entries.items()
+                    if now - entry.last_used > self.idle_seconds]
+            evicted = [self._entries.pop(session_id) for session_id in idle]
+        for entry in evicted:
+            entry.engine.close()
+        if idle:
+            custom_print(f"Evicted idle sessions: {idle}")
@@ -0,0 +1,152 @@
+import functools
+import os
+import numpy as np
+from scipy import fft
+from .result_cache import ResultCache
+
+# Threads per transform (scipy.fft splits a 2-D transform's rows and columns across them)
+FFT_WORKERS = int(os.environ.get('FFT_WORKERS', 0)) or os.cpu_count() or 1
+
+# Frequency grids and transfer functions by padded shape, bounded by their bytes
+spectral_cache = ResultCache(int(float(os.environ.get('SPECTRAL_CACHE_MAX_MB', 64)) * 1024 * 1024))
+
+
+@functools.lru_cache(maxsize=256)
+def fast_length(n):
+    """Smallest length >= n with a fast real transform (a product of small primes)"""
+    return fft.next_fast_len(n, real=True)
+
+
+def frequency_radius(padded, shape):
+    """Distance of every rfft2 bin of a padded transform from the zero frequency.
+
+    Distances are in bins of an unpadded transform of shape, so a cutoff means
+    the same frequency whether or not the image was padded. The grid is read-only
+    and shared through spectral_cache.
+    """
+    key = ('radius', padded, shape)
+    radius = spectral_cache.get(key)
+    if radius is not None:
+        return radius
+    rows = fft.fftfreq(padded[0]).astype(np.float32) * shape[0]
+    cols = fft.rfftfreq(padded[1]).astype(np.float32) * shape[1]
+    radius = np.sqrt(rows[:, None] ** 2 + cols[None, :] ** 2)
+    radius.flags.writeable = False
+    spectral_cache.put(key, radius)
+    return radius
+
+
+def transfer_function(padded, image_shape, cutoff, profile='ideal', order=2, highpass=False):
+    """Low- or high-pass transfer function on the rfft2 bins of a padded transform.
+
+    Profiles: 'ideal' keeps the frequencies within cutoff (a sharp circle),
+    'gaussian' falls off as exp(-r^2 / 2 cutoff^2) and 'butterworth' as
+    1 / (1 + (r / cutoff)^(2 order)). A high-pass is one minus the low-pass.
+    Masks are float32, read-only and kept in spectral_cache by shape, cutoff
+    and profile.
+    """
+    key = ('transfer', padded, image_shape, cutoff, profile, order, highpass)
+    mask = spectral_cache.get(key)
+    if mask is not None:
+        return mask
+    radius = frequency_radius(padded, image_shape)
+    if profile == 'ideal':
+        mask = (radius <= cutoff).astype(np.float32)
+    elif profile == 'gaussian':
+        mask = np.exp(-radius ** 2 / np.float32(2 * max(cutoff, 1e-3) ** 2))
+    elif profile == 'butterworth':
+        mask = 1 / (1 + (radius / np.float32(max(cutoff, 1e-3))) ** (2 * order))
+    else:
+        raise ValueError(f"Unknown filter profile: {profile}")
+    if highpass:
+        mask = 1 - mask
+    mask.flags.writeable = False
+    spectral_cache.put(key, mask)
+    return mask
+
+
+class Spectrum:
+    """Spectrum of a real grayscale image, kept as the half plane of a real FFT.
+
+    data is rfft2 of the image padded to a fast size, in complex64, with the
+    zero frequency at [0, 0]; the other half follows from Hermitian symmetry.
+    image_shape is the size of the image it was computed from and the inverse
+    is cropped back to it. Filters are not applied to data: their transfer
+    functions are multiplied into transfer, and only the inverse transform (or
+    a conversion to an array) applies the combined function, once.
+    np.asarray() of a spectrum gives the full centered spectrum, as
+    np.fft.fftshift(np.fft.fft2(padded image)) would, cropped around the zero
+    frequency to image_shape. scipy.fft caches the plans of recently used sizes.
+    """
+
+    def __init__(self, data, image_shape, padded, transfer=None):
+        self.data = data
+        self.image_shape = image_shape
+        self.padded = padded
+        self.transfer = transfer
+
+    @classmethod
+    def of(cls, gray):
+        image_shape = gray.shape[:2]
+        padded = (fast_length(image_shape[0]), fast_length(image_shape[1]))
+        gray = np.asarray(gray, dtype=np.float32)
+        if padded != image_shape:
+            # Mirroring avoids a hard edge where the padded image wraps around
+            gray = np.pad(gray, ((0, padded[0] - image_shape[0]), (0, padded[1] - image_shape[1])), mode='symmetric')
+        return cls(fft.rfft2(gray, workers=FFT_WORKERS), image_shape, padded)
+
+    @property
+    def shape(self):
+        return self.image_shape
+
+    @property
+    def dtype(self):
+        return self.data.dtype
+
+    @property
+    def nbytes(self):
+        return self.data.nbytes + (0 if self.transfer is None else self.transfer.nbytes)
+
+    def radius(self):
+        """Distance of each bin in data from the zero frequency (see frequency_radius)"""
+        return frequency_radius(self.padded, self.image_shape)
+
+    def transfer_function(self, cutoff, profile='ideal', order=2, highpass=False):
+        """Cached transfer function for this spectrum's shape (see transfer_function)"""
+        return transfer_function(self.padded, self.image_shape, cutoff, profile, order, highpass)
+
+    def filtered(self, transfer):
+        """Spectrum multiplied by a transfer function laid out like data"""
+        if self.transfer is not None:
+            transfer = self.transfer * transfer
+        return Spectrum(self.data, self.image_shape, self.padded, transfer)
+
+    def values(self):
+        """data with the transfer function applied"""
+        return self.data if self.transfer is None else self.data * self.transfer
+
+    def to_image(self):
+        """Inverse transform as a float32 image of image_shape"""
+        image = fft.irfft2(self.values(), s=self.padded, workers=FFT_WORKERS)
+        return image[:self.image_shape[0], :self.image_shape[1]]
+
+    def _centered(self, half):
+        """Centered plane of image_shape from a half plane laid out like data"""
+        cols = self.padded[1]
+        # Column -j of the full spectrum mirrors column j at row -i (conjugated)
+        mirrored = np.roll(half[::-1], 1, axis=0)[:, 1:cols - cols // 2][:, ::-1]
+        if np.iscomplexobj(mirrored):
+            mirrored = np.conj(mirrored)
+        full = fft.fftshift(np.hstack([half, mirrored]))
+        # Keep the zero frequency where fftshift puts it for an unpadded image
+        top = self.padded[0] // 2 - self.image_shape[0] // 2
+        left = cols // 2 - self.image_shape[1] // 2
+        return full[top:top + self.image_shape[0], left:left + self.image_shape[1]]
+
+    def magnitude(self):
+        """Centered magnitude of the spectrum (see _centered), in float32"""
+        return self._centered(np.abs(self.values()))
+
+    def __array__(self, dtype=None, copy=None):
+        full = self._centered(self.values())
+        return full if dtype is None else full.astype(dtype)
@@ -0,0 +1,29 @@
+import numpy as np
+
+DEFAULT_TILE_ROWS = 512
+
+
+def run_tiled(nodes, image, tile_rows=DEFAULT_TILE_ROWS):
+    """Stream an image through a chain of NeighborhoodNodes in horizontal strips.
+
+    Each strip is read with enough extra rows (the sum of the chain's halos) that
+    its output rows are exact, so intermediate buffers are strip-sized rather than
+    frame-sized. Strips touching the top or bottom of the frame see the real image
+    border and get each node's own border handling. Only the last node's output
+    is stitched into a full frame.
+    """
+    height = image.shape[0]
+    context = sum(node.get_halo() for node in nodes)
+    output = None
+    for top in range(0, height, tile_rows):
+        bottom = min(height, top + tile_rows)
+        start = max(0, top - context)
+        stop = min(height, bottom + context)
+        strip = image[start:stop]
+        for node in nodes:
+            strip = node.filter_image(strip)
+        rows = strip[top - start:top - start + (bottom - top)]
+        if output is None:
+            output = np.empty((height,) + rows.shape[1:], dtype=rows.dtype)
+        output[top:bottom] = rows
+    return nodes[-1].finish_image(output)
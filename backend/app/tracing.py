@@ -0,0 +1,65 @@
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager, nullcontext
+
+
+class Tracer:
+    """Collects spans of one run in the Chrome trace-event format.
+
+    span() records a complete ('X') event with the calling thread's id, so spans
+    on graph workers and preview encoders show up as separate tracks. to_dict()
+    is loadable in chrome://tracing, Perfetto or speedscope.
+    """
+
+    def __init__(self):
+        self.pid = os.getpid()
+        self._origin = time.perf_counter()
+        self._events = []
+        self._threads = {}
+        self._lock = threading.Lock()
+
+    def _now_us(self):
+        return (time.perf_counter() - self._origin) * 1e6
+
+    @contextmanager
+    def span(self, name, category='graph', **args):
+        start = self._now_us()
+        try:
+            yield
+        finally:
+            self.add(name, category, start, self._now_us() - start, **args)
+
+    def add(self, name, category, start_us, duration_us, **args):
+        thread = threading.current_thread()
+        event = {'name': name, 'cat': category, 'ph': 'X', 'ts': start_us, 'dur': duration_us,
+                 'pid': self.pid, 'tid': thread.ident}
+        if args:
+            event['args'] = args
+        with self._lock:
+            self._events.append(event)
+            self._threads[thread.ident] = thread.name
+
+    def to_dict(self):
+        with self._lock:
+            events = list(self._events)
+            threads = dict(self._threads)
+        # Metadata events name the process and thread tracks
+        metadata = [{'name': 'process_name', 'ph': 'M', 'pid': self.pid, 'tid': 0,
+                     'args': {'name': 'node editor backend'}}]
+        metadata += [{'name': 'thread_name', 'ph': 'M', 'pid': self.pid, 'tid': tid, 'args': {'name': name}}
+                     for tid, name in threads.items()]
+        return {'traceEvents': metadata + sorted(events, key=lambda event: event['ts']),
+                'displayTimeUnit': 'ms'}
+
+    def save(self, path):
+        with open(path, 'w') as f:
+            json.dump(self.to_dict(), f)
+
+
+def trace_span(tracer, name, category='graph', **args):
+    """tracer.span(...), or a no-op context when tracing is off (tracer is None)"""
+    if tracer is None:
+        return nullcontext()
+    return tracer.span(name, category, **args)
@@ -0,0 +1,174 @@
+#!/usr/bin/env python3
+"""
+Headless batch runner for the Node-Based Image Processing Interface
+Applies a saved graph (graph_state.json format) to every image in a directory
+
+Usage:
+    python batch.py app/graph_state.json input_dir output_dir [--workers N]
+"""
+
+import argparse
+import io
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from pathlib import Path
+
+import numpy as np
+from PIL import Image
+
+IMAGE_EXTENSIONS = {'.png', '.jpg', '.jpeg', '.bmp', '.tif', '.tiff', '.webp'}
+
+# Per-process engine, built once by the pool initializer
+_engine = None
+
+
+def init_worker(graph_state, tile_rows=None):
+    """Build an in-memory engine for this worker process"""
+    global _engine
+    from app.graph_engine import GraphEngine
+    # Files are independent and decoded once, so neither caching nor intra-graph threads pay off here
+    _engine = GraphEngine(cache_max_bytes=0, decoded_cache_max_bytes=0, max_workers=1, persist=False,
+                          tile_rows=tile_rows)
+    _engine.load_graph_state(graph_state)
+
+
+def nodes_of_type(engine, node_type):
+    return [node_id for node_id, node in engine.nodes.items() if node['type'] == node_type]
+
+
+def save_image(image, path):
+    if image.dtype != np.uint8:
+        image = np.clip(image, 0, 255).astype(np.uint8)
+    if len(image.shape) == 2:
+        Image.fromarray(image, mode='L').save(path)
+    else:
+        Image.fromarray(image).save(path)
+
+
+def process_file(path, output_base, image_format):
+    """Run the graph on one image file and write every Output node's image to output_base.<format>"""
+    start = time.perf_counter()
+    try:
+        with open(path, 'rb') as f:
+            data = f.read()
+        for node_id in nodes_of_type(_engine, 'ImageInput'):
+            if not _engine.set_image(node_id, io.BytesIO(data)):
+                raise ValueError('could not decode image')
+
+        output_nodes = nodes_of_type(_engine, 'Output')
+        results = _engine.execute_graph(targets=output_nodes)
+
+        os.makedirs(os.path.dirname(output_base), exist_ok=True)
+        written = []
+        for node_id in output_nodes:
+            image = results.get(node_id, {}).get('image')
+            if image is None:
+                continue
+            # Name files after the input; add the node id when the graph has several outputs
+            base = output_base if len(output_nodes) == 1 else f"{output_base}_{node_id}"
+            out_path = f"{base}.{image_format}"
+            save_image(image, out_path)
+            written.append(out_path)
+        if not written:
+            raise ValueError('graph produced no output image')
+
+        return {'file': str(path), 'outputs': written, 'seconds': time.perf_counter() - start}
+    except Exception as e:
+        return {'file': str(path), 'error': str(e), 'seconds': time.perf_counter() - start}
+
+
+def find_images(input_dir, recursive):
+    pattern = '**/*' if recursive else '*'
+    return sorted(p for p in Path(input_dir).glob(pattern)
+                  if p.is_file() and p.suffix.lower() in IMAGE_EXTENSIONS)
+
+
+def output_bases(files, input_dir, output_dir):
+    """Output path (without extension) of each input file, mirroring its directory under output_dir.
+
+    Inputs that differ only in their extension (scan.png, scan.tif) keep it in
+    the name (scan_png, scan_tif) so they don't overwrite each other.
+    """
+    relative = [path.relative_to(input_dir).with_suffix('') for path in files]
+    counts = {}
+    for rel in relative:
+        counts[rel] = counts.get(rel, 0) + 1
+    return [os.path.join(output_dir, rel if counts[rel] == 1 else f"{rel}_{path.suffix[1:]}")
+            for path, rel in zip(files, relative)]
+
+
+def summarize(records, wall_seconds):
+    timings = np.array([r['seconds'] for r in records if 'error' not in r])
+    summary = {
+        'files': len(records),
+        'succeeded': int(len(timings)),
+        'failed': len(records) - int(len(timings)),
+        'wall_seconds': wall_seconds,
+        'files_per_second': len(records) / wall_seconds if wall_seconds > 0 else 0.0,
+    }
+    if len(timings):
+        summary.update({
+            'mean_seconds': float(timings.mean()),
+            'p50_seconds': float(np.percentile(timings, 50)),
+            'p95_seconds': float(np.percentile(timings, 95)),
+            'max_seconds': float(timings.max()),
+        })
+    return summary
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Apply a saved node graph to a directory of images')
+    parser.add_argument('graph', help='graph state JSON (as written by save_graph_state_to_disk or Save Graph)')
+    parser.add_argument('input_dir', help='directory of input images')
+    parser.add_argument('output_dir', help='directory for output images')
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1, help='worker processes')
+    parser.add_argument('--format', default='png', help='output image format/extension (default: png)')
+    parser.add_argument('--recursive', action='store_true', help='search input_dir recursively')
+    parser.add_argument('--report', help='write per-file timings and a summary to this JSON file')
+    parser.add_argument('--tile-rows', type=int, help='stream chains of neighborhood filters in strips of this many rows')
+    args = parser.parse_args(argv)
+
+    with open(args.graph, 'r') as f:
+        graph_state = json.load(f)
+    # Accept both the raw state and the /save_graph response wrapper
+    graph_state = graph_state.get('graph_state', graph_state)
+
+    files = find_images(args.input_dir, args.recursive)
+    if not files:
+        print(f"No images found in {args.input_dir}")
+        return 1
+    os.makedirs(args.output_dir, exist_ok=True)
+
+    print(f"Processing {len(files)} images with {args.workers} workers...")
+    records = []
+    start = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=args.workers, initializer=init_worker,
+                             initargs=(graph_state, args.tile_rows)) as executor:
+        futures = [executor.submit(process_file, str(path), output_base, args.format)
+                   for path, output_base in zip(files, output_bases(files, args.input_dir, args.output_dir))]
+        for done, future in enumerate(as_completed(futures), 1):
+            record = future.result()
+            records.append(record)
+            status = f"ERROR {record['error']}" if 'error' in record else f"{record['seconds']:.3f}s"
+            print(f"[{done}/{len(files)}] {record['file']}: {status}")
+    wall_seconds = time.perf_counter() - start
+
+    summary = summarize(records, wall_seconds)
+    print("=" * 50)
+    print(f"{summary['succeeded']}/{summary['files']} images in {wall_seconds:.2f}s "
+          f"({summary['files_per_second']:.2f} images/s)")
+    if summary['succeeded']:
+        print(f"Per image: mean {summary['mean_seconds']:.3f}s, p50 {summary['p50_seconds']:.3f}s, "
+              f"p95 {summary['p95_seconds']:.3f}s, max {summary['max_seconds']:.3f}s")
+
+    if args.report:
+        with open(args.report, 'w') as f:
+            json.dump({'summary': summary, 'files': records}, f, indent=2)
+    return 0 if summary['failed'] == 0 else 2
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,302 @@
+#!/usr/bin/env python3
+"""
+Benchmark suite for the Node-Based Image Processing Interface
+Times every registered node class and a set of representative graphs on
+synthetic grayscale, RGB and RGBA images, and compares runs against a baseline
+
+Usage:
+    python benchmark.py [--sizes 512 2048 8192] [--output bench.json]
+    python benchmark.py --compare baseline.json [--threshold 0.1]
+    python benchmark.py --results bench.json --compare baseline.json
+"""
+
+import argparse
+import json
+import os
+import platform
+import sys
+import time
+import tracemalloc
+
+import numpy as np
+
+MODES = {'gray': (), 'rgb': (3,), 'rgba': (4,)}
+
+# Nodes that consume another node's output socket instead of an image
+UPSTREAM = {
+    'HighPassFilter': ('FourierTransform', 'fft'),
+    'LowPassFilter': ('FourierTransform', 'fft'),
+}
+
+# Representative graphs: (node type, params) chains from the input to an Output node,
+# or a dict of node id -> (type, params, upstream node id) for branching graphs
+GRAPHS = {
+    'point_chain': [
+        ('BrightnessContrast', {'brightness': 10, 'contrast': 1.2}),
+        ('ContrastStretching', {'min': 20, 'max': 230}),
+        ('LogPowerLaw', {'gamma': 0.8}),
+        ('Threshold', {'threshold': 128}),
+    ],
+    'neighborhood_chain': [
+        ('AverageFiltering', {'kernel_size': 5}),
+        ('GaussianKernel', {}),
+        ('LaplacianMask', {}),
+    ],
+    'sharpen': [
+        ('GaussianBlur', {'radius': 4}),
+        ('UnsharpMasking', {}),
+        ('HighBoostFiltering', {}),
+    ],
+    'frequency': [
+        ('FourierTransform', {}),
+        ('LowPassFilter', {'cutoff': 30}),
+    ],
+    'frequency_chain': [
+        ('FourierTransform', {}),
+        ('LowPassFilter', {'cutoff': 80, 'profile': 'butterworth'}),
+        ('HighPassFilter', {'cutoff': 10, 'profile': 'gaussian'}),
+    ],
+    'edges': {
+        'blur': ('GaussianBlur', {'radius': 2}, 'input'),
+        'sobel': ('SobelFilter', {}, 'blur'),
+        'laplacian': ('LaplacianFilter', {}, 'blur'),
+        'canny': ('EdgeDetection', {}, 'blur'),
+        'histogram': ('HistogramEqualization', {}, 'input'),
+    },
+}
+
+
+def synthetic_image(size, mode, seed=0):
+    """A deterministic test image: smooth gradients plus noise, so histograms and edges are realistic"""
+    rng = np.random.default_rng(seed)
+    y, x = np.mgrid[0:size, 0:size].astype(np.float32) / size
+    channels = MODES[mode][0] if MODES[mode] else 1
+    planes = []
+    for channel in range(channels):
+        phase = channel * 2.1
+        plane = 127.5 + 90 * np.sin(6 * x + phase) * np.cos(4 * y - phase)
+        plane += rng.normal(0, 12, (size, size)).astype(np.float32)
+        planes.append(plane)
+    if mode == 'rgba':
+        planes[3] = np.full((size, size), 255, dtype=np.float32)
+    image = np.clip(np.stack(planes, axis=-1), 0, 255).astype(np.uint8)
+    return image[..., 0] if channels == 1 else image
+
+
+def new_engine():
+    from app.graph_engine import GraphEngine
+    # Caching would turn every repeat after the first into a cache hit
+    return GraphEngine(cache_max_bytes=0, max_workers=1, persist=False)
+
+
+def set_input(engine, image, name):
+    engine.add_node('input', 'ImageInput')
+    engine.node_instances['input'].set_decoded(
+        image, f"benchmark-{name}", {'shape': image.shape, 'dtype': str(image.dtype)})
+
+
+def connect(engine, from_node, to_node, socket='image'):
+    engine.add_connection(from_node, socket, to_node, socket)
+
+
+def build_node_case(node_type, image, name):
+    """Engine with input -> [upstream] -> node; returns (engine, node id to re-run)"""
+    engine = new_engine()
+    set_input(engine, image, name)
+    if node_type in UPSTREAM:
+        upstream_type, socket = UPSTREAM[node_type]
+        engine.add_node('upstream', upstream_type)
+        connect(engine, 'input', 'upstream')
+        engine.add_node('node', node_type)
+        connect(engine, 'upstream', 'node', socket)
+        return engine, 'node'
+    if node_type != 'ImageInput':
+        engine.add_node('node', node_type)
+        connect(engine, 'input', 'node')
+        return engine, 'node'
+    return engine, 'input'
+
+
+def build_graph_case(graph, image, name):
+    """Engine for a representative graph; returns (engine, input node id re-run each time)"""
+    engine = new_engine()
+    set_input(engine, image, name)
+    if isinstance(graph, dict):
+        for node_id, (node_type, params, upstream) in graph.items():
+            engine.add_node(node_id, node_type, params)
+        for node_id, (node_type, params, upstream) in graph.items():
+            connect(engine, upstream, node_id)
+        leaves = set(graph) - {upstream for _, _, upstream in graph.values()}
+    else:
+        previous = 'input'
+        for index, (node_type, params) in enumerate(graph):
+            node_id = f"n{index}"
+            engine.add_node(node_id, node_type, params)
+            # Frequency filters take the spectrum of the previous node
+            connect(engine, previous, node_id, 'fft' if node_type in UPSTREAM else 'image')
+            previous = node_id
+        leaves = {previous}
+    for index, leaf in enumerate(sorted(leaves)):
+        engine.add_node(f"out{index}", 'Output')
+        connect(engine, leaf, f"out{index}")
+    return engine, 'input'
+
+
+def run_once(engine, dirty_node, timed_node):
+    """Execute with dirty_node (and everything downstream) stale; returns milliseconds"""
+    engine.mark_dirty(dirty_node)
+    # Like batch runs, only the Output nodes are wanted, so intermediate nodes can be fused
+    outputs = [node_id for node_id, node in engine.nodes.items() if node['type'] == 'Output']
+    results = engine.execute_graph(targets=outputs or None, proxy=False)
+    if timed_node is None:
+        return engine.last_timings['execute_ms'], results
+    return engine.last_timings['nodes'][timed_node]['wall_ms'], results
+
+
+def measure(engine, dirty_node, timed_node, pixels, repeat, max_seconds):
+    """Latency percentiles, throughput and peak traced memory of one case"""
+    # Warm-up run: imports, lazy kernels and first-touch allocations are not measured
+    run_once(engine, dirty_node, timed_node)
+    samples = []
+    started = time.perf_counter()
+    while len(samples) < repeat and (not samples or time.perf_counter() - started < max_seconds):
+        samples.append(run_once(engine, dirty_node, timed_node)[0])
+    # Peak memory is measured on a separate run, since tracing slows allocation down
+    tracemalloc.start()
+    try:
+        tracemalloc.reset_peak()
+        base = tracemalloc.get_traced_memory()[0]
+        run_once(engine, dirty_node, timed_node)
+        peak = tracemalloc.get_traced_memory()[1] - base
+    finally:
+        tracemalloc.stop()
+    samples = np.array(samples)
+    p50 = float(np.percentile(samples, 50))
+    return {
+        'runs': int(len(samples)),
+        'mean_ms': float(samples.mean()),
+        'min_ms': float(samples.min()),
+        'p50_ms': p50,
+        'p90_ms': float(np.percentile(samples, 90)),
+        'p99_ms': float(np.percentile(samples, 99)),
+        'mpix_per_s': pixels / 1e6 / (p50 / 1000) if p50 > 0 else None,
+        'peak_mb': peak / (1024 * 1024),
+    }
+
+
+def node_types(selected=None):
+    """One registered type name per node class (aliases such as MedianFiltering are skipped)"""
+    classes = new_engine().node_classes
+    seen = set()
+    types = []
+    for node_type, node_class in classes.items():
+        if node_class in seen or (selected and node_type not in selected):
+            continue
+        seen.add(node_class)
+        types.append(node_type)
+    return types
+
+
+def run_suite(args):
+    cases = {}
+    plans = [('node', node_type) for node_type in node_types(args.nodes)]
+    plans += [('graph', name) for name in GRAPHS if args.graphs is None or name in args.graphs]
+    for size in args.sizes:
+        for mode in args.modes:
+            image = synthetic_image(size, mode)
+            name = f"{mode}-{size}"
+            for kind, target in plans:
+                key = f"{kind}:{target}:{name}"
+                try:
+                    if kind == 'node':
+                        engine, dirty_node = build_node_case(target, image, name)
+                        timed_node = dirty_node
+                    else:
+                        engine, dirty_node = build_graph_case(GRAPHS[target], image, name)
+                        timed_node = None
+                    record = measure(engine, dirty_node, timed_node, size * size, args.repeat, args.max_seconds)
+                    engine.close()
+                    status = f"p50 {record['p50_ms']:.2f} ms, {record['mpix_per_s'] or 0:.1f} Mpix/s, peak {record['peak_mb']:.1f} MB"
+                except Exception as e:
+                    record = {'error': str(e)}
+                    status = f"ERROR {e}"
+                record.update({'kind': kind, 'target': target, 'mode': mode, 'size': size})
+                cases[key] = record
+                print(f"{key}: {status}")
+    return cases
+
+
+def environment():
+    import cv2
+    import scipy
+    return {
+        'python': platform.python_version(),
+        'numpy': np.__version__,
+        'scipy': scipy.__version__,
+        'opencv': cv2.__version__,
+        'platform': platform.platform(),
+        'cpu_count': os.cpu_count(),
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+    }
+
+
+def compare(results, baseline, threshold, min_ms):
+    """Cases whose p50 latency or peak memory grew by more than threshold (a fraction)"""
+    regressions = []
+    for key, record in results['cases'].items():
+        base = baseline['cases'].get(key)
+        if base is None or 'error' in record or 'error' in base:
+            continue
+        # Latencies below min_ms are dominated by noise
+        if max(base['p50_ms'], record['p50_ms']) >= min_ms and record['p50_ms'] > base['p50_ms'] * (1 + threshold):
+            regressions.append((key, 'p50_ms', base['p50_ms'], record['p50_ms']))
+        if base['peak_mb'] >= 1 and record['peak_mb'] > base['peak_mb'] * (1 + threshold):
+            regressions.append((key, 'peak_mb', base['peak_mb'], record['peak_mb']))
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Benchmark node classes and representative graphs')
+    parser.add_argument('--sizes', type=int, nargs='+', default=[512, 2048], help='square image sizes (default: 512 2048)')
+    parser.add_argument('--modes', nargs='+', choices=list(MODES), default=list(MODES), help='image modes (default: all)')
+    parser.add_argument('--nodes', nargs='*', help='node types to benchmark (default: every registered class)')
+    parser.add_argument('--graphs', nargs='*', help=f"graphs to benchmark (default: all of {', '.join(GRAPHS)})")
+    parser.add_argument('--repeat', type=int, default=7, help='timed runs per case (default: 7)')
+    parser.add_argument('--max-seconds', type=float, default=10.0, help='stop repeating a case after this long (default: 10)')
+    parser.add_argument('--output', default='benchmark_results.json', help='write results to this JSON file')
+    parser.add_argument('--results', help='compare an existing results file instead of running the suite')
+    parser.add_argument('--compare', metavar='BASELINE', help='flag regressions against a baseline results file')
+    parser.add_argument('--threshold', type=float, default=0.1, help='allowed slowdown/memory growth as a fraction (default: 0.1)')
+    parser.add_argument('--min-ms', type=float, default=0.5, help='ignore latency changes of cases faster than this (default: 0.5)')
+    args = parser.parse_args(argv)
+    # Per-execution log lines would dominate short cases
+    os.environ.setdefault('LOG_LEVEL', 'WARNING')
+
+    if args.results:
+        with open(args.results, 'r') as f:
+            results = json.load(f)
+    else:
+        started = time.perf_counter()
+        results = {'environment': environment(), 'cases': run_suite(args)}
+        results['environment']['wall_seconds'] = time.perf_counter() - started
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
+        failed = sum('error' in record for record in results['cases'].values())
+        print("=" * 50)
+        print(f"{len(results['cases'])} cases ({failed} failed) in {results['environment']['wall_seconds']:.1f}s, "
+              f"written to {args.output}")
+
+    if args.compare:
+        with open(args.compare, 'r') as f:
+            baseline = json.load(f)
+        regressions = compare(results, baseline, args.threshold, args.min_ms)
+        print("=" * 50)
+        for key, metric, before, after in regressions:
+            print(f"REGRESSION {key} {metric}: {before:.2f} -> {after:.2f} ({after / before - 1:+.0%})")
+        print(f"{len(regressions)} regressions against {args.compare} (threshold {args.threshold:.0%})")
+        return 2 if regressions else 0
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -118,10 +118,12 @@ const App = () => {
   // Add refs for nodes and edges after useState declarations
   const nodesRef = useRef(nodes);
   const edgesRef = useRef(edges);
+  const selectedNodeRef = useRef(selectedNode);
 
   // Keep refs updated with latest state
   useEffect(() => { nodesRef.current = nodes; }, [nodes]);
   useEffect(() => { edgesRef.current = edges; }, [edges]);
+  useEffect(() => { selectedNodeRef.current = selectedNode; }, [selectedNode]);
 
   // Process the entire graph
   const processGraphData = useCallback(async () => {
@@ -145,8 +147,12 @@ const App = () => {
         to_node: edge.target,
         to_socket: edge.targetHandle
       }));
-      console.log('Sending to backend:', { nodeUpdates, connections });
-      const response = await processGraph(nodeUpdates, connections);
+      // Only the selected node is previewed (the backend adds the Output nodes), so the
+      // backend evaluates just what feeds them and can fuse the nodes in between
+      const selected = selectedNodeRef.current;
+      const previewNodes = selected ? [selected.id] : [];
+      console.log('Sending to backend:', { nodeUpdates, connections, previewNodes });
+      const response = await processGraph(nodeUpdates, connections, null, false, previewNodes);
       console.log('Backend response:', response);
       // Only update UI if this is the latest request
       if (requestId !== latestRequestId.current) {
@@ -264,6 +270,14 @@ const App = () => {
     }
   }, [setEdges, debouncedProcessGraphData, nodes, edges]);
 
+  // A newly selected node needs its own preview
+  const selectedNodeId = selectedNode ? selectedNode.id : null;
+  useEffect(() => {
+    if (selectedNodeId) {
+      debouncedProcessGraphData();
+    }
+  }, [selectedNodeId, debouncedProcessGraphData]);
+
   // Handle node selection
   const onNodeClick = useCallback((event, node) => {
     console.log('Selected node:', node);
@@ -543,6 +543,31 @@ const PreviewPanel = ({ image, selectedNode, onUpdateParams, onFileUpload, uploa
               />
               <div className="param-value">{hpBoost?.toFixed(2) ?? params.boost}</div>
             </div>
+            <div className="param-group">
+              <label>Profile</label>
+              <select
+                value={params.profile ?? 'ideal'}
+                onChange={(e) => handleParamChange('profile', e.target.value)}
+              >
+                <option value="ideal">Ideal</option>
+                <option value="gaussian">Gaussian</option>
+                <option value="butterworth">Butterworth</option>
+              </select>
+            </div>
+            {params.profile === 'butterworth' && (
+              <div className="param-group">
+                <label>Order: {params.order ?? 2}</label>
+                <input
+                  type="range"
+                  min="1"
+                  max="10"
+                  step="1"
+                  value={params.order ?? 2}
+                  onChange={e => handleParamChange('order', parseInt(e.target.value))}
+                />
+                <div className="param-value">{params.order ?? 2}</div>
+              </div>
+            )}
           </>
         )}
         {nodeType === 'lowPassFilterNode' && (
@@ -571,6 +596,31 @@ const PreviewPanel = ({ image, selectedNode, onUpdateParams, onFileUpload, uploa
               />
               <div className="param-value">{lpBoost?.toFixed(2) ?? params.boost}</div>
             </div>
+            <div className="param-group">
+              <label>Profile</label>
+              <select
+                value={params.profile ?? 'ideal'}
+                onChange={(e) => handleParamChange('profile', e.target.value)}
+              >
+                <option value="ideal">Ideal</option>
+                <option value="gaussian">Gaussian</option>
+                <option value="butterworth">Butterworth</option>
+              </select>
+            </div>
+            {params.profile === 'butterworth' && (
+              <div className="param-group">
+                <label>Order: {params.order ?? 2}</label>
+                <input
+                  type="range"
+                  min="1"
+                  max="10"
+                  step="1"
+                  value={params.order ?? 2}
+                  onChange={e => handleParamChange('order', parseInt(e.target.value))}
+                />
+                <div className="param-value">{params.order ?? 2}</div>
+              </div>
+            )}
           </>
         )}
         {nodeType === 'resizeBiggerNode' && (
@@ -12,6 +12,7 @@ const HighPassFilterNode = ({ data, id, onRemove }) => {
         <div className="node-description">{data.description}</div>
         <div className="node-params">
           <div>Cutoff: {data.params?.cutoff ?? 'Default'}</div>
+          <div>Profile: {data.params?.profile ?? 'ideal'}</div>
         </div>
       </div>
       <Handle
@@ -24,7 +25,14 @@ const HighPassFilterNode = ({ data, id, onRemove }) => {
         type="source"
         position="right"
         id="filtered"
-        style={{ background: '#007bff' }}
+        style={{ top: '35%', background: '#007bff' }}
+      />
+      {/* Filtered spectrum, for chaining frequency-domain filters */}
+      <Handle
+        type="source"
+        position="right"
+        id="fft"
+        style={{ top: '65%', background: '#007bff' }}
       />
     </div>
   );
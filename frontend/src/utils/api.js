@@ -2,12 +2,25 @@ import axios from 'axios';
 
 const API_BASE_URL = process.env.REACT_APP_API_URL || 'https://node-based-editor.onrender.com';
 
+// Each browser tab edits its own graph; the backend keys its state by this id
+const getSessionId = () => {
+  let sessionId = window.sessionStorage.getItem('sessionId');
+  if (!sessionId) {
+    sessionId = `${Date.now().toString(36)}-${Math.random().toString(36).slice(2, 10)}`;
+    window.sessionStorage.setItem('sessionId', sessionId);
+  }
+  return sessionId;
+};
+
+export const SESSION_ID = getSessionId();
+
 // Create axios instance with default config
 const api = axios.create({
   baseURL: API_BASE_URL,
   timeout: 30000,
   headers: {
     'Content-Type': 'application/json',
+    'X-Session-ID': SESSION_ID,
   },
 });
 
@@ -25,12 +38,37 @@ export const uploadImage = async (file, nodeId) => {
   return response.data;
 };
 
-export const processGraph = async (nodeUpdates, connections) => {
-  const response = await api.post('/process', {
+export const processGraph = async (nodeUpdates, connections, targets = null, render = false, previewNodes = null) => {
+  const payload = {
     node_updates: nodeUpdates,
     connections: connections
-  });
-  return response.data;
+  };
+  // Only evaluate the nodes feeding these targets (e.g. Output nodes)
+  if (targets) {
+    payload.targets = targets;
+  }
+  // Previews run on downscaled proxies; render=true asks for full resolution
+  if (render) {
+    payload.render = true;
+  }
+  // Only evaluate and preview these nodes (Output nodes are always included)
+  if (previewNodes) {
+    payload.preview_nodes = previewNodes;
+  }
+  // Images are fetched from /result/<node>/<socket> (HTTP-cached by ETag) instead of inlined as base64
+  payload.transport = 'binary';
+  const response = await api.post('/process', payload);
+  const data = response.data;
+  if (data.success && data.results) {
+    Object.values(data.results).forEach((result) => {
+      const image = result.outputs && result.outputs.image;
+      if (image) {
+        // <img> requests cannot send headers, so the session goes in the query
+        result.preview = `${API_BASE_URL}${image.url}&session_id=${SESSION_ID}`;
+      }
+    });
+  }
+  return data;
 };
 
 export const addNode = async (nodeId, nodeType, params = {}) => {
@@ -183,16 +183,16 @@ const nodeTypes = {
     description: 'Apply a high-pass filter in the frequency domain.',
     type: 'highPassFilterNode',
     inputs: ['fft'],
-    outputs: ['filtered'],
-    defaultParams: { cutoff: 30 }
+    outputs: ['filtered', 'fft'],
+    defaultParams: { cutoff: 30, profile: 'ideal' }
   },
   lowPassFilter: {
     name: 'Low-pass Filtering',
     description: 'Apply a low-pass filter in the frequency domain.',
     type: 'lowPassFilterNode',
     inputs: ['fft'],
-    outputs: ['filtered'],
-    defaultParams: { cutoff: 30 }
+    outputs: ['filtered', 'fft'],
+    defaultParams: { cutoff: 30, profile: 'ideal' }
   },
   resizeBigger: {
     name: 'Resize (Bigger)',